@@ -0,0 +1,90 @@
+"""
+Parity check and speed benchmark for the `cached_*` scorers in `util.fuzzy`.
+
+Every cached scorer must return the same 0-100 score as the `SequenceMatcher` scorer it replaces,
+in both argument orders, over a seeded random corpus plus the IANA timezone names.
+The run fails with an `AssertionError` on the first mismatch.
+
+Run from the repository root:
+    python benchmarks/bench_fuzzy.py [--seed 1] [--size 1000] [--repeat 5]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+import zoneinfo
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, Path(__file__).resolve().parents[1].joinpath("pnwbot").as_posix())
+
+import util.fuzzy as fuzzy  # noqa: E402
+
+Scorer = Callable[[str, str], int]
+
+PAIRS: list[tuple[Scorer, Scorer]] = [
+    (fuzzy.ratio, fuzzy.cached_ratio),
+    (fuzzy.quick_ratio, fuzzy.cached_quick_ratio),
+    (fuzzy.partial_ratio, fuzzy.cached_partial_ratio),
+    (fuzzy.token_sort_ratio, fuzzy.cached_token_sort_ratio),
+    (fuzzy.quick_token_sort_ratio, fuzzy.cached_quick_token_sort_ratio),
+    (fuzzy.partial_token_sort_ratio, fuzzy.cached_partial_token_sort_ratio),
+]
+
+
+def corpus(seed: int, size: int) -> tuple[list[str], list[str]]:
+    rng: random.Random = random.Random(seed)
+    _letters: str = string.ascii_letters + " _"
+    words: list[str] = ["".join(rng.choice(_letters) for _ in range(rng.randint(0, 25))) for _ in range(size)]
+    words += sorted(zoneinfo.available_timezones())
+    queries: list[str] = ["".join(rng.choice(string.ascii_lowercase + " ") for _ in range(rng.randint(0, 12))) for _ in range(30)]
+    queries += ["new york", "los angles", "berlin", "pst", "america/chi", "Eastern Time"]
+    return words, queries
+
+
+def check_parity(words: list[str], queries: list[str]) -> int:
+    checked: int = 0
+    for plain, cached in PAIRS:
+        for query in queries:
+            for word in words:
+                for a, b in ((query, word), (word, query)):
+                    expected, got = plain(a, b), cached(a, b)
+                    assert expected == got, f"{cached.__name__}({a!r}, {b!r}) = {got}, {plain.__name__} = {expected}"
+                    checked += 1
+    return checked
+
+
+def bench(words: list[str], queries: list[str], repeat: int) -> None:
+    print(f"{'scorer':<34}{'plain ms':>10}{'cached ms':>11}{'speedup':>9}   (extract limit=10 over {len(words):,} choices, per query)")
+    for plain, cached in PAIRS:
+        # One warm pass so the cached scorer's preprocessed choices are in place, like a long running bot.
+        for query in queries:
+            fuzzy.extract(query, words, scorer=cached, limit=10)
+        timings: list[float] = []
+        for scorer in (plain, cached):
+            best: float = float("inf")
+            for _ in range(repeat):
+                _start: float = time.perf_counter()
+                for query in queries:
+                    fuzzy.extract(query, words, scorer=scorer, limit=10)
+                best = min(best, time.perf_counter() - _start)
+            timings.append(best / len(queries) * 1000)
+        assert [fuzzy.extract(q, words, scorer=plain, limit=10) for q in queries] == [fuzzy.extract(q, words, scorer=cached, limit=10) for q in queries]
+        print(f"{cached.__name__:<34}{timings[0]:>10.2f}{timings[1]:>11.2f}{timings[0] / timings[1]:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--size", type=int, default=1000, help="Random words added to the timezone names.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per scorer, the best one is reported.")
+    args = parser.parse_args()
+
+    words, queries = corpus(seed=args.seed, size=args.size)
+    print(f"Parity: {check_parity(words=words, queries=queries):,} comparisons match.")
+    bench(words=words, queries=queries[-6:], repeat=args.repeat)
+
+
+if __name__ == "__main__":
+    main()
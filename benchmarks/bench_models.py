@@ -0,0 +1,176 @@
+"""
+Memory and throughput of the slotted, lazily converted database models on 100k row loads.
+
+`PlainUser` / `PlainLeave` below are the models as they were before, plain dataclasses with a `__dict__`
+that convert every timestamp in `__post_init__`. `SlottedUser` / `SlottedLeave` are `database.user.User` / `Leave` as they are
+now, `@dataclass(slots=True)` with the real `database.lazy.lazy_timestamps`. They are declared here because importing
+`database.user` needs discord.py and the connection pool, and their fields are checked against `schema.sql`.
+All of them are built with `cls(**row)` from the same `sqlite3.Row`s.
+`build` is the bulk load alone, eg. `get_banned_users` where only the IDs are used, `build+read` also reads every
+timestamp once so the lazy conversion is paid for. Memory is measured after `build`.
+
+Run from the repository root:
+    python benchmarks/bench_models.py [--rows 100000] [--repeat 3]
+"""
+import argparse
+import gc
+import importlib.util
+import re
+import sqlite3
+import sys
+import time
+import tracemalloc
+from dataclasses import MISSING, dataclass, field, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+DATABASE: Path = Path(__file__).resolve().parents[1].joinpath("pnwbot", "database")
+
+# Loaded by path, `import database.lazy` would run the package `__init__` and need discord.py.
+_spec = importlib.util.spec_from_file_location("database_lazy", DATABASE.joinpath("lazy.py"))
+assert _spec is not None and _spec.loader is not None
+lazy = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(lazy)
+
+
+@dataclass
+class PlainLeave:
+    user_id: int
+    created_at: datetime
+
+    def __post_init__(self) -> None:
+        self.created_at = datetime.fromtimestamp(timestamp=self.created_at)  # type: ignore
+
+
+@dataclass
+class PlainUser:
+    guild_id: int
+    user_id: int
+    created_at: datetime
+    verified: bool
+    last_active_at: datetime
+    banned: bool
+    cleaned: bool
+    departed: bool
+    user_leaves: set = field(default_factory=set)
+    user_infractions: set = field(default_factory=set)
+    user_images: set = field(default_factory=set)
+
+    def __post_init__(self) -> None:
+        self.created_at = datetime.fromtimestamp(timestamp=self.created_at)  # type: ignore
+        self.last_active_at = datetime.fromtimestamp(timestamp=self.last_active_at)  # type: ignore
+        self.verified = bool(self.verified)
+        self.banned = bool(self.banned)
+        self.cleaned = bool(self.cleaned)
+        self.departed = bool(self.departed)
+
+
+@lazy.lazy_timestamps("created_at")
+@dataclass(slots=True)
+class SlottedLeave:
+    user_id: int
+    created_at: datetime
+
+
+@lazy.lazy_timestamps("created_at", "last_active_at")
+@dataclass(slots=True)
+class SlottedUser:
+    guild_id: int
+    user_id: int
+    created_at: datetime
+    verified: bool
+    last_active_at: datetime
+    banned: bool
+    cleaned: bool
+    departed: bool
+    user_leaves: set = field(default_factory=set)
+    user_infractions: set = field(default_factory=set)
+    user_images: set = field(default_factory=set)
+
+    def __post_init__(self) -> None:
+        self.verified = bool(self.verified)
+        self.banned = bool(self.banned)
+        self.cleaned = bool(self.cleaned)
+        self.departed = bool(self.departed)
+
+
+def schema_columns(table: str) -> set[str]:
+    """
+    The column names of a `schema.sql` table, the lines that start with a lowercase name and a type.
+    """
+    _body: re.Match[str] | None = re.search(rf"IF NOT EXISTS {table} \((.*?)\) STRICT;", DATABASE.joinpath("schema.sql").read_text(), flags=re.DOTALL)
+    assert _body is not None, f"{table} is not in schema.sql"
+    return {match.group(1) for match in re.finditer(r"^\s+([a-z_]+) (?:INTEGER|REAL|TEXT)", _body.group(1), flags=re.MULTILINE)}
+
+
+def load_rows(count: int) -> tuple[list[sqlite3.Row], list[sqlite3.Row]]:
+    conn: sqlite3.Connection = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.executescript(DATABASE.joinpath("schema.sql").read_text())
+    conn.execute("""INSERT INTO guilds(guild_id) VALUES(1)""")
+    conn.executemany("""INSERT INTO users(user_id, guild_id, created_at, verified, last_active_at) VALUES(?, ?, ?, ?, ?)""",
+                     ((i, 1, 1.7e9 + i, i % 2, 1.7e9 + i) for i in range(count)))
+    conn.executemany("""INSERT INTO user_leaves(user_id, created_at) VALUES(?, ?)""", ((i, 1.7e9 + i) for i in range(count)))
+    users: list[sqlite3.Row] = conn.execute("""SELECT * FROM users""").fetchall()
+    leaves: list[sqlite3.Row] = conn.execute("""SELECT * FROM user_leaves""").fetchall()
+    conn.close()
+    return users, leaves
+
+
+def build(model: type, rows: list[sqlite3.Row], timestamps: tuple[str, ...] = ()) -> list[Any]:
+    models: list[Any] = [model(**row) for row in rows]
+    for instance in models:
+        for name in timestamps:
+            getattr(instance, name)
+    return models
+
+
+def best_time(func: Callable[[], Any], repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        _start: float = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - _start)
+    return best
+
+
+def memory(func: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    _kept = func()  # noqa: F841 - held so the models count towards the current size
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per model, the best one is reported.")
+    args = parser.parse_args()
+
+    for model, table in ((SlottedUser, "users"), (SlottedLeave, "user_leaves")):
+        # The `set` fields with a default factory are filled in later, not loaded from the row.
+        _missing: set[str] = schema_columns(table) ^ {item.name for item in fields(model) if item.default_factory is MISSING}
+        assert not _missing, f"{model.__name__} is out of step with the `{table}` table: {sorted(_missing)}"
+
+    users, leaves = load_rows(count=args.rows)
+    cases: list[tuple[str, type, type, list[sqlite3.Row], tuple[str, ...]]] = [
+        ("User", PlainUser, SlottedUser, users, ("created_at", "last_active_at")),
+        ("Leave", PlainLeave, SlottedLeave, leaves, ("created_at",)),
+    ]
+    print(f"{args.rows:,} rows per model, built with cls(**row), best of {args.repeat}")
+    print(f"{'model':<8}{'build ms':>18}{'build+read ms':>18}{'memory MB':>18}")
+    print(f"{'':<8}" + f"{'before -> after':>18}" * 3)
+    for name, before, after, rows, timestamps in cases:
+        assert not hasattr(build(after, rows[:1])[0], "__dict__"), f"{name} is not slotted"
+        built: list[float] = [best_time(lambda model=model: build(model, rows), repeat=args.repeat) * 1000 for model in (before, after)]
+        read: list[float] = [best_time(lambda model=model: build(model, rows, timestamps), repeat=args.repeat) * 1000 for model in (before, after)]
+        sizes: list[float] = [memory(lambda model=model: build(model, rows)) / 1024**2 for model in (before, after)]
+        print(f"{name:<8}" + "".join(f"{f'{a:.1f} -> {b:.1f}':>18}" for a, b in (built, read, sizes)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Compares `util.timezones.TimezoneIndex` against the linear scan `Love.timezone_set_autocomplete` used before it.
+
+The choices are built offline from the IANA names (`zoneinfo`) plus `_timezone_aliases`, so no CLDR download is needed.
+For every query the old scan answers, the index must return the same entries (or a full page of 25),
+and the typo queries the old scan can't answer must resolve to the expected zone.
+
+Run from the repository root:
+    python benchmarks/bench_timezones.py [--repeat 200]
+"""
+import argparse
+import sys
+import time
+import zoneinfo
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, Path(__file__).resolve().parents[1].joinpath("pnwbot").as_posix())
+
+from discord.app_commands import Choice  # noqa: E402
+from util.timezones import TimezoneIndex, _timezone_aliases  # noqa: E402
+
+QUERIES: list[str] = ["", "p", "pa", "pst", "los ang", "eastern", "toky", "berl", "kolkata", "America/Chi", "sao paulo"]
+# Query -> the zone the first result must be, none of these are substrings of any entry.
+TYPOS: dict[str, str] = {
+    "los angles": "America/Los_Angeles",
+    "new yrok": "America/New_York",
+    "amsterdm": "Europe/Amsterdam",
+    "sydeny": "Australia/Sydney",
+}
+
+
+def build_choices() -> tuple[list[Choice[str]], dict[str, str]]:
+    """
+    Stands in for `parse_bcp47_timezones()`, one `<City>, <Region>` entry per IANA zone like the CLDR descriptions.
+    """
+    choices: list[Choice[str]] = []
+    for zone in sorted(zoneinfo.available_timezones()):
+        if "/" in zone and not zone.startswith(("Etc", "posix", "right")):
+            region, _, city = zone.rpartition("/")
+            choices.append(Choice(name=f"{city.replace('_', ' ')}, {region.split('/')[0]}", value=zone))
+    return choices, dict(_timezone_aliases)
+
+
+def linear_scan(choices: list[Choice[str]], aliases: dict[str, str]) -> Callable[[str], list[Choice[str]]]:
+    """
+    The `timezone_set_autocomplete` body before `TimezoneIndex`.
+    """
+    def search(current: str) -> list[Choice[str]]:
+        cur_choices = list(choices)
+        for key, value in aliases.items():
+            if current.lower() in key.lower():
+                cur_choices.append(Choice(name=key, value=value))
+        return [tz for tz in cur_choices if current.lower() in tz.name.lower()][:25]
+    return search
+
+
+def check(index: TimezoneIndex, old: Callable[[str], list[Choice[str]]]) -> None:
+    for query in QUERIES:
+        expected: set[tuple[str, str]] = {(choice.name, choice.value) for choice in old(query)}
+        got: list[Choice[str]] = index.search(query)
+        assert len(got) <= 25, f"{query!r}: {len(got)} results"
+        if len(got) < 25:
+            missing = expected - {(choice.name, choice.value) for choice in got}
+            assert not missing, f"{query!r}: the index misses {sorted(missing)[:3]}"
+    for query, zone in TYPOS.items():
+        assert old(query) == [], f"{query!r} is not a typo for the old scan"
+        got = index.search(query)
+        assert got and got[0].value == zone, f"{query!r}: expected {zone}, got {[choice.value for choice in got[:3]]}"
+
+
+def timed(func: Callable[[str], list[Choice[str]]], query: str, repeat: int) -> float:
+    _start: float = time.perf_counter()
+    for _ in range(repeat):
+        func(query)
+    return (time.perf_counter() - _start) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per query.")
+    args = parser.parse_args()
+
+    choices, aliases = build_choices()
+    _start: float = time.perf_counter()
+    index: TimezoneIndex = TimezoneIndex(choices=choices, aliases=aliases)
+    print(f"Built an index of {len(index):,} entries in {(time.perf_counter() - _start) * 1000:.1f}ms")
+
+    old = linear_scan(choices=choices, aliases=aliases)
+    check(index=index, old=old)
+    print("Parity: the index returns every entry the linear scan does, and resolves the typos.")
+
+    print(f"{'query':<16}{'old us':>10}{'index us':>10}")
+    for query in QUERIES + list(TYPOS):
+        print(f"{query!r:<16}{timed(old, query, args.repeat):>10.1f}{timed(index.search, query, args.repeat):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
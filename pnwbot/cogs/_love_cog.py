@@ -16,6 +16,7 @@ from typing import Any, List, NamedTuple, Optional, Self, Union
 import discord
 import pytz
 import util.asqlite as asqlite
+from database.base import immediate_transaction
 import util.timezones
 from discord import Member, app_commands
 from discord.app_commands import Choice
@@ -458,19 +459,20 @@ class LoverEntry:
 
     async def delete_lover(self) -> int:
         async with asqlite.connect(DB_FILENAME) as db:
-            async with db.cursor() as cur:
-                # remove from partner tables
-                await cur.execute(
-                    """DELETE FROM partners WHERE lovers_id = ?""", self.discord_id
-                )
-                await cur.execute(
-                    """DELETE FROM kinks where lovers_id = ?""", self.discord_id
-                )
-                await cur.execute(
-                    """DELETE FROM lovers WHERE discord_id = ?""", self.discord_id)
-                await db.commit()
+            # All three deletes commit together.
+            async with immediate_transaction(conn=db):
+                async with db.cursor() as cur:
+                    # remove from partner tables
+                    await cur.execute(
+                        """DELETE FROM partners WHERE lovers_id = ?""", self.discord_id
+                    )
+                    await cur.execute(
+                        """DELETE FROM kinks where lovers_id = ?""", self.discord_id
+                    )
+                    await cur.execute(
+                        """DELETE FROM lovers WHERE discord_id = ?""", self.discord_id)
 
-                return cur.get_cursor().rowcount
+                    return cur.get_cursor().rowcount
 
     # async def update_lover(self, name: str, role: int, position: int, role_switching: bool = False, position_switching: bool = False) -> LoverEntry:
     async def update_lover(self, args: dict[str, int | bool]) -> LoverEntry:
@@ -770,9 +772,11 @@ class Love(commands.Cog):
         self._last_utc_minutes: int = (discord.utils.utcnow().hour * 60 + discord.utils.utcnow().minute)
 
     async def cog_load(self) -> None:
-        # Generate our list of "Choices"
-        self._timezones_choices: list[Choice[str]] = await util.timezones.parse_bcp47_timezones()
+        # Our list of "Choices" needs a network request, so only the aliases are searchable until it runs after READY.
+        self._timezones_choices: list[Choice[str]] = []
         self._timezone_aliases: dict[str, str] = util.timezones._timezone_aliases
+        self._timezone_index = util.timezones.TimezoneIndex(choices=self._timezones_choices, aliases=self._timezone_aliases)
+        self._bot._startup.defer(name="love_timezones", func=self._load_timezones)
         self._time_table = TimeTable()
 
         async with asqlite.connect(DB_FILENAME) as db:
@@ -783,6 +787,11 @@ class Love(commands.Cog):
 
         # await self.love_message_loop.start()
 
+    async def _load_timezones(self) -> None:
+        # Generate our list of "Choices"
+        self._timezones_choices = await util.timezones.parse_bcp47_timezones()
+        self._timezone_index = util.timezones.TimezoneIndex(choices=self._timezones_choices, aliases=self._timezone_aliases)
+
     async def cog_unload(self) -> None:
         if self.love_message_loop.is_running() is True:
             self.love_message_loop.cancel()
@@ -943,12 +952,7 @@ class Love(commands.Cog):
     async def timezone_set_autocomplete(
             self, interaction: discord.Interaction,
             current: str) -> list[app_commands.Choice[str]]:
-        cur_choices = list(self._timezones_choices)
-        for key, value in self._timezone_aliases.items():
-            if current.lower() in key.lower():
-                cur_choices.append(app_commands.Choice(name=key, value=value))
-
-        return [tz for tz in cur_choices if current.lower() in tz.name.lower()][:25]
+        return self._timezone_index.search(current=current)
 
         # if not argument:
         #     return timezones._default_timezones
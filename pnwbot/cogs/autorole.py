@@ -1,12 +1,15 @@
+import asyncio
 import logging
 import os
+import time
+import weakref
 from re import Match, Pattern, compile
-from typing import TYPE_CHECKING, Any, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Optional, Union
 
 import discord
 import discord.http
 from database import *
-from database.settings import Role_Embed_Info
+from database.settings import Role_Embed_Info, Role_Group
 from discord import (ButtonStyle, Embed, Emoji, Message, PartialEmoji,
                      app_commands)
 from discord.ext import commands, tasks
@@ -43,51 +46,145 @@ class AutoRole(commands.Cog):
 
     def __init__(self, bot: "MrFriendly") -> None:
         self.bot: "MrFriendly" = bot
+        self._role_embed_messages: dict[int, int] = {}  # Message ID -> Channel ID of every role embed we have stored.
+        self._role_embeds_verified: dict[int, float] = {}  # Message ID -> `time.monotonic()` it was last fetched successfully.
+        self._role_groups: dict[int, dict[str, Role_Group]] = {}  # Guild ID -> Group name -> Role Group
+        self._role_group_index: dict[int, Role_Group] = {}  # Role ID -> the Role Group it belongs to
+        # Member ID -> Lock held while swapping their group role, dropped once nothing waits on it.
+        self._member_role_locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
         self._logger.info(msg=f"{self.__class__.__name__} Cog has been loaded!")
 
     REACTION_ROLES_BUTTON_REGEX: Pattern[str] = compile(pattern=r'RR::BUTTON::(?P<ROLE_ID>\d+)')
-    AGE_ROLE_GROUP: list[int] = [1259692047036715128, 1259660826915110942, 1259660900445454378, 1259661047602610176, 1259661129299267705]
-    SEX_ORIENTATION_ROLE_GROUP: list[int] = [1259661460804599929, 1259661532095320074, 1259661605902483536, 1259661655319515236, 1259661691453571134, 1259661715004588134, 1259661742066110585, 1259661787758858304]
-    GENDER_ROLE_GROUP: list[int] = [1259650732005789706, 1259650866835619912, 1259650920858386472, 1259650994707628052, 1259651332575596544, 1259683302760255558]
-    PRONOUNS_ROLE_GROUP: list[int] = [1259660711835992136, 1259660769155354725, 1259660799555928194, 1259683965695164456]
-    RELATIONSHIP_ROLE_GROUP: list[int] = [1259661152309215373, 1259661187155755139, 1259661227911680070, 1259661289433727026]
-    DM_ROLE_GROUP: list[int] = [1259698813795565649, 1259698893558517822, 1259698953105051728]
-    LOCATION_ROLE_GROUP: list[int] = [1260380394872635392, 1260380525860880515, 1260380565731934339, 1260380601953816669]
+    role_group = app_commands.Group(name="role_group", description="Manage the exclusive role groups used by role embeds.", guild_only=True)
+
+    # The groups that used to be hard coded, seeded into the database for any guild that has these roles and no groups yet.
+    DEFAULT_ROLE_GROUPS: dict[str, list[int]] = {
+        "age": [1259692047036715128, 1259660826915110942, 1259660900445454378, 1259661047602610176, 1259661129299267705],
+        "sex_orientation": [1259661460804599929, 1259661532095320074, 1259661605902483536, 1259661655319515236, 1259661691453571134, 1259661715004588134, 1259661742066110585, 1259661787758858304],
+        "gender": [1259650732005789706, 1259650866835619912, 1259650920858386472, 1259650994707628052, 1259651332575596544, 1259683302760255558],
+        "pronouns": [1259660711835992136, 1259660769155354725, 1259660799555928194, 1259683965695164456],
+        "relationship": [1259661152309215373, 1259661187155755139, 1259661227911680070, 1259661289433727026],
+        "dm": [1259698813795565649, 1259698893558517822, 1259698953105051728],
+        "location": [1260380394872635392, 1260380525860880515, 1260380565731934339, 1260380601953816669],
+    }
+
+    # The background audit only fetches embeds it hasn't verified within `VALIDATE_MAX_AGE` seconds,
+    # at most `VALIDATE_BUDGET` of them per run. Deletes are normally caught by the raw events below.
+    VALIDATE_MAX_AGE: float = 6 * 60 * 60
+    VALIDATE_BUDGET: int = 10
 
     async def cog_load(self) -> None:
+        for embed in await Role_Embed_Info.get_every_role_embed():
+            self._role_embed_messages[embed.message_id] = embed.channel_id
+        for group in await Role_Group.get_all_role_groups():
+            self._index_role_group(group=group)
+        self.bot._startup.defer(name="role_groups", func=self._seed_role_groups)
         self.validate_role_embeds.start()
 
-    @tasks.loop(minutes=1, reconnect=True)
+    def _index_role_group(self, group: Role_Group) -> None:
+        self._role_groups.setdefault(group.guild_id, {})[group.name] = group
+        for role_id in group.roles:
+            self._role_group_index[role_id] = group
+
+    def _unindex_role_group(self, group: Role_Group) -> None:
+        self._role_groups.get(group.guild_id, {}).pop(group.name, None)
+        for role_id in group.roles:
+            if self._role_group_index.get(role_id) is group:
+                self._role_group_index.pop(role_id)
+
+    async def _seed_role_groups(self) -> None:
+        """
+        Moves the previously hard coded role groups into the database for the guild they belong to.
+        """
+        for guild in self.bot.guilds:
+            if len(self._role_groups.get(guild.id, {})) != 0:
+                continue
+            for name, role_ids in self.DEFAULT_ROLE_GROUPS.items():
+                _role_ids: list[int] = [role_id for role_id in role_ids if guild.get_role(role_id) is not None]
+                if len(_role_ids) == 0:
+                    continue
+                # Make sure the guild row exists for the foreign key.
+                await Settings.add_or_get_settings(guild_id=guild.id)
+                group: Role_Group = await Role_Group.add_role_group(guild_id=guild.id, name=name)
+                for role_id in _role_ids:
+                    await group.add_role(role_id=role_id)
+                self._index_role_group(group=group)
+                self._logger.info(msg=f"Seeded the Role Group {name} with {len(_role_ids)} roles. | Guild ID: {guild.id}")
+
+    async def cog_unload(self) -> None:
+        self.validate_role_embeds.cancel()
+
+    def _forget_role_embeds(self, message_ids: list[int]) -> None:
+        for message_id in message_ids:
+            self._role_embed_messages.pop(message_id, None)
+            self._role_embeds_verified.pop(message_id, None)
+
+    @commands.Cog.listener(name="on_raw_message_delete")
+    async def role_embed_on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        if payload.message_id not in self._role_embed_messages:
+            return
+        self._forget_role_embeds(message_ids=[payload.message_id])
+        await Role_Embed_Info.remove_role_embeds_by_message(message_ids=[payload.message_id])
+        self._logger.warn(msg=f"Removed a deleted Role Embed Message from the Database. | Message ID: {payload.message_id} | Guild ID: {payload.guild_id}")
+
+    @commands.Cog.listener(name="on_raw_bulk_message_delete")
+    async def role_embed_on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent) -> None:
+        _message_ids: list[int] = [message_id for message_id in payload.message_ids if message_id in self._role_embed_messages]
+        if len(_message_ids) == 0:
+            return
+        self._forget_role_embeds(message_ids=_message_ids)
+        await Role_Embed_Info.remove_role_embeds_by_message(message_ids=_message_ids)
+        self._logger.warn(msg=f"Removed {len(_message_ids)} deleted Role Embed Messages from the Database. | Guild ID: {payload.guild_id}")
+
+    @commands.Cog.listener(name="on_guild_channel_delete")
+    async def role_embed_on_channel_delete(self, channel: discord.abc.GuildChannel) -> None:
+        _message_ids: list[int] = [message_id for message_id, channel_id in self._role_embed_messages.items() if channel_id == channel.id]
+        if len(_message_ids) == 0:
+            return
+        self._forget_role_embeds(message_ids=_message_ids)
+        await Role_Embed_Info.remove_role_embeds_by_channel(channel_id=channel.id)
+        self._logger.warn(msg=f"Removed {len(_message_ids)} Role Embed Messages of a deleted channel from the Database. | Channel ID: {channel.id} | Guild ID: {channel.guild.id}")
+
+    @tasks.loop(minutes=15, reconnect=True)
     async def validate_role_embeds(self) -> None:
         """
         Validates the Role Embeds we generated and stored in our database.
-        """
 
-        for guild in self.bot.guilds:
+        Only catches what the delete events missed (eg. while the bot was offline), so it checks a few of the
+        least recently verified embeds per run instead of fetching all of them.
+        """
+        _embeds: list[Role_Embed_Info] = await Role_Embed_Info.get_every_role_embed()
+        self._role_embed_messages = {embed.message_id: embed.channel_id for embed in _embeds}
+        self._role_embeds_verified = {message_id: verified for message_id, verified in self._role_embeds_verified.items() if message_id in self._role_embed_messages}
+
+        _now: float = time.monotonic()
+        _due: list[Role_Embed_Info] = sorted(
+            (embed for embed in _embeds if embed.message_id not in self._role_embeds_verified or _now - self._role_embeds_verified[embed.message_id] >= self.VALIDATE_MAX_AGE),
+            key=lambda embed: self._role_embeds_verified.get(embed.message_id, 0))
+
+        for embed in _due[:self.VALIDATE_BUDGET]:
+            _guild: discord.Guild | None = self.bot.get_guild(embed.guild_id)
+            if _guild is None:
+                continue
+            _channel = _guild.get_channel(embed.channel_id)
+            if _channel is None or not isinstance(_channel, discord.TextChannel):
+                continue
             try:
-                _guild_embeds: list[Role_Embed_Info] = await Role_Embed_Info.get_all_role_embeds(guild_id=guild.id)
-            except ValueError:
-                # self._logger.warn(msg=f"No Role Embeds in this Guild | Guild ID: {guild.id}")
+                await _channel.fetch_message(embed.message_id)
+                self._role_embeds_verified[embed.message_id] = time.monotonic()
+            except discord.NotFound:
+                await Role_Embed_Info.remove_role_embed(embed_info=embed)
+                self._forget_role_embeds(message_ids=[embed.message_id])
+                self._logger.warn(msg=f"Removed a Role Embed Info Message from the Database. | Embed ID: {embed.id} | Guild ID: {_guild.id}")
+            except discord.HTTPException:
+                self._logger.error(msg=f"Failed to find a Role Embed Info Message `HTTPException`, {embed.guild_id} {embed.channel_id} {embed.message_id} | Guild ID: {_guild.id}")
                 continue
-
-            for embed in _guild_embeds:
-                _guild: discord.Guild | None = self.bot.get_guild(embed.guild_id)
-                if _guild is None:
-                    continue
-                _channel = _guild.get_channel(embed.channel_id)
-                if _channel is None or not isinstance(_channel, discord.TextChannel):
-                    continue
-                try:
-                    await _channel.fetch_message(embed.message_id)
-                except discord.NotFound:
-                    await Role_Embed_Info.remove_role_embed(embed_info=embed)
-                    self._logger.warn(msg=f"Removed a Role Embed Info Message from the Database. | Embed ID: {embed.id} | Guild ID: {guild.id}")
-                except discord.HTTPException:
-                    self._logger.error(msg=f"Failed to find a Role Embed Info Message `HTTPException`, {embed.guild_id} {embed.channel_id} {embed.message_id} | Guild ID: {guild.id}")
-                    continue
-                except Exception as e:
-                    await Role_Embed_Info.remove_role_embed(embed_info=embed)
-                    self._logger.error(msg=f"Failed to find a Role Embed Info Message removing from the Database. | Embed ID: {embed.guild_id} Embed Channel ID: {embed.channel_id} Embed Message ID: {embed.message_id} | Guild ID: {guild.id}")
+            except Exception as e:
+                await Role_Embed_Info.remove_role_embed(embed_info=embed)
+                self._forget_role_embeds(message_ids=[embed.message_id])
+                self._logger.error(msg=f"Failed to find a Role Embed Info Message removing from the Database. | Embed ID: {embed.guild_id} Embed Channel ID: {embed.channel_id} Embed Message ID: {embed.message_id} | Guild ID: {_guild.id}")
+            # Spread the requests out, this is a background audit.
+            await asyncio.sleep(1)
 
     async def autocomplete_role_embeds(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[int]]:
         assert interaction.guild
@@ -138,35 +235,99 @@ class AutoRole(commands.Cog):
 
         custom_id: Any | str = (interaction.data or {}).get('custom_id', '')
         match: Match[str] | None = self.REACTION_ROLES_BUTTON_REGEX.fullmatch(custom_id)
-        _groups: List[List[int]] = [self.AGE_ROLE_GROUP, self.SEX_ORIENTATION_ROLE_GROUP, self.GENDER_ROLE_GROUP,
-                                    self.PRONOUNS_ROLE_GROUP, self.RELATIONSHIP_ROLE_GROUP, self.DM_ROLE_GROUP,
-                                    self.LOCATION_ROLE_GROUP]
         if match:
             role_id = int(match.group('ROLE_ID'))
             _reaction_role: discord.Role | None = interaction.guild.get_role(role_id)
             if not _reaction_role:
                 return await interaction.response.send_message(content='Sorry, that role does not seem to exist anymore...', ephemeral=True, delete_after=10)
 
-            group: List[int] | None = next((group for group in _groups if _reaction_role.id in group), None)
-            if group is None:
+            group: Role_Group | None = self._role_group_index.get(_reaction_role.id)
+            if group is None or group.guild_id != interaction.guild.id:
                 return
-            _removed_role = False
-            for role_id in group:
-                # If the user doesn't have any of the existing roles in the group we add the.
-                if interaction.user.get_role(role_id) is None:
-                    continue
-                else:
-                    role: discord.Role | None = interaction.guild.get_role(role_id)
-                    if not isinstance(role, discord.Role):
-                        return await interaction.response.send_message(content='Sorry, that role does not seem to exist anymore...', ephemeral=True, delete_after=10)
-                    _removed_role = True
-                    await interaction.user.remove_roles(role, atomic=True)
-
-            _settings: Settings = self.bot._settings
-            await interaction.user.add_roles(_reaction_role, atomic=True)
-            return await interaction.response.send_message(content=f"Reassigned your role to {_reaction_role.mention} from {role.mention}."
-                                                           if _removed_role is True else f"Gave you the role {_reaction_role.mention}.",
-                                                           ephemeral=True, delete_after=15)
+
+            # Acknowledged before waiting on the lock and the API calls, the interaction expires after 3 seconds.
+            await interaction.response.defer(ephemeral=True)
+            # `edit(roles=...)` replaces the whole role list, so swaps of the same member run one at a time
+            # and each starts from the member fetched inside the lock, not the interaction payload or a lagging cache.
+            _lock: asyncio.Lock = self._member_role_locks.setdefault(interaction.user.id, asyncio.Lock())
+            async with _lock:
+                _member: discord.Member = await interaction.guild.fetch_member(interaction.user.id)
+                _removed: list[discord.Role] = [role for role in _member.roles if role.id in group.roles and role.id != _reaction_role.id]
+                if len(_removed) != 0 or _reaction_role not in _member.roles:
+                    _roles: list[discord.Role] = [role for role in _member.roles if not role.is_default() and role.id not in group.roles]
+                    await _member.edit(roles=_roles + [_reaction_role], reason=f"Role Group {group.name} selection.")
+
+            await interaction.followup.send(content=f"Reassigned your role to {_reaction_role.mention} from {', '.join(role.mention for role in _removed)}."
+                                            if len(_removed) != 0 else f"Gave you the role {_reaction_role.mention}.",
+                                            ephemeral=True, delete_after=15)
+
+    async def autocomplete_role_groups(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        assert interaction.guild
+        return [app_commands.Choice(name=name, value=name) for name in self._role_groups.get(interaction.guild.id, {}) if current.lower() in name.lower()][:25]
+
+    @role_group.command(name="create", description="Create a role group, members can only hold one role of a group.")
+    @app_commands.checks.has_role("Moderator")
+    async def role_group_create(self, interaction: discord.Interaction, name: str) -> None:
+        assert interaction.guild
+        _settings: Settings = await Settings.add_or_get_settings(guild_id=interaction.guild.id)
+        try:
+            group: Role_Group = await Role_Group.add_role_group(guild_id=interaction.guild.id, name=name.lower())
+        except ValueError:
+            return await interaction.response.send_message(content=f"The Role Group **{name.lower()}** already exists.", ephemeral=True, delete_after=_settings.msg_timeout)
+        self._index_role_group(group=group)
+        return await interaction.response.send_message(content=f"Created the Role Group **{group.name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+
+    @role_group.command(name="delete", description="Delete a role group.")
+    @app_commands.checks.has_role("Moderator")
+    @app_commands.autocomplete(name=autocomplete_role_groups)
+    async def role_group_delete(self, interaction: discord.Interaction, name: str) -> None:
+        assert interaction.guild
+        _settings: Settings = await Settings.add_or_get_settings(guild_id=interaction.guild.id)
+        group: Role_Group | None = self._role_groups.get(interaction.guild.id, {}).get(name)
+        if group is None:
+            return await interaction.response.send_message(content=f"Failed to find the Role Group **{name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+        self._unindex_role_group(group=group)
+        await group.remove()
+        return await interaction.response.send_message(content=f"Deleted the Role Group **{name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+
+    @role_group.command(name="add_role", description="Add a role to a role group, moving it out of any other group.")
+    @app_commands.checks.has_role("Moderator")
+    @app_commands.autocomplete(name=autocomplete_role_groups)
+    async def role_group_add_role(self, interaction: discord.Interaction, name: str, role: discord.Role) -> None:
+        assert interaction.guild
+        _settings: Settings = await Settings.add_or_get_settings(guild_id=interaction.guild.id)
+        group: Role_Group | None = self._role_groups.get(interaction.guild.id, {}).get(name)
+        if group is None:
+            return await interaction.response.send_message(content=f"Failed to find the Role Group **{name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+        _previous: Role_Group | None = self._role_group_index.get(role.id)
+        if _previous is not None and _previous is not group:
+            _previous.roles.discard(role.id)
+        await group.add_role(role_id=role.id)
+        self._role_group_index[role.id] = group
+        return await interaction.response.send_message(content=f"Added {role.mention} to the Role Group **{name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+
+    @role_group.command(name="remove_role", description="Remove a role from a role group.")
+    @app_commands.checks.has_role("Moderator")
+    @app_commands.autocomplete(name=autocomplete_role_groups)
+    async def role_group_remove_role(self, interaction: discord.Interaction, name: str, role: discord.Role) -> None:
+        assert interaction.guild
+        _settings: Settings = await Settings.add_or_get_settings(guild_id=interaction.guild.id)
+        group: Role_Group | None = self._role_groups.get(interaction.guild.id, {}).get(name)
+        if group is None or role.id not in group.roles:
+            return await interaction.response.send_message(content=f"{role.mention} is not in the Role Group **{name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+        await group.remove_role(role_id=role.id)
+        self._role_group_index.pop(role.id, None)
+        return await interaction.response.send_message(content=f"Removed {role.mention} from the Role Group **{name}**.", ephemeral=True, delete_after=_settings.msg_timeout)
+
+    @role_group.command(name="list", description="List the role groups and their roles.")
+    async def role_group_list(self, interaction: discord.Interaction) -> None:
+        assert interaction.guild
+        _settings: Settings = await Settings.add_or_get_settings(guild_id=interaction.guild.id)
+        _groups: dict[str, Role_Group] = self._role_groups.get(interaction.guild.id, {})
+        if len(_groups) == 0:
+            return await interaction.response.send_message(content="There are no Role Groups in this guild.", ephemeral=True, delete_after=_settings.msg_timeout)
+        _content: str = "\n".join(f"**{name}**: {' '.join(f'<@&{role_id}>' for role_id in group.roles) or '*No roles*'}" for name, group in _groups.items())
+        return await interaction.response.send_message(content=_content[:2000], ephemeral=True, delete_after=_settings.msg_timeout)
 
     @app_commands.command(name='role_embed')
     @commands.guild_only()
@@ -196,6 +357,8 @@ class AutoRole(commands.Cog):
         await interaction.response.send_message(content="Please wait while I create the embed...", ephemeral=True, delete_after=2)
         _msg: discord.Message = await channel.send(embed=_embed, view=_role_view)
         await Role_Embed_Info.add_role_embeds(name=embed_title, guild_id=interaction.guild.id, channel_id=channel.id, message_id=_msg.id)
+        self._role_embed_messages[_msg.id] = channel.id
+        self._role_embeds_verified[_msg.id] = time.monotonic()
 
     @app_commands.command(name="add_button")
     @commands.guild_only()
@@ -113,14 +113,15 @@ class InfractionsCog(commands.Cog):
     @app_commands.command(name="list_infractions")
     @commands.guild_only()
     @commands.has_role("Moderator")
-    async def list_infractions(self, interaction: Interaction, user: Union[discord.User, discord.Member]) -> None:
+    @app_commands.describe(archived="Include infractions moved to the archive.")
+    async def list_infractions(self, interaction: Interaction, user: Union[discord.User, discord.Member], archived: bool = False) -> None:
         # Since we have `guild_only()` we can assume that `context.guild` is not `None`
         assert interaction.guild
         _settings: Settings = self.bot._settings
         _user: User | None = await User.add_or_get_user(guild_id=interaction.guild.id, user_id=user.id)
         if _user is None:
             return await interaction.response.send_message(content=f"Unable to find or create {user.name} in the database.", ephemeral=True, delete_after=_settings.msg_timeout)
-        _infractions: set[Infraction] = await _user.get_infractions()
+        _infractions: set[Infraction] = await _user.get_infractions(include_archived=archived)
         if len(_infractions) == 0:
             return await interaction.response.send_message(content=f"{user.name} has no infractions.", ephemeral=True, delete_after=_settings.msg_timeout)
         _content: str = f"{Emojis.ticket} | Infractions for **{user}**:\n"
@@ -5,6 +5,7 @@ from pathlib import Path
 from typing import Any, Self, Union
 
 import util.asqlite as asqlite
+from database.base import immediate_transaction
 
 script_loc: Path = Path(__file__).parent
 DB_FILENAME = "lovers.sqlite"
@@ -109,19 +110,20 @@ class LoverEntry:
 
     async def delete_lover(self) -> int:
         async with asqlite.connect(DB_FILENAME) as db:
-            async with db.cursor() as cur:
-                # remove from partner tables
-                await cur.execute(
-                    """DELETE FROM partners WHERE lovers_id = ?""", self.discord_id
-                )
-                await cur.execute(
-                    """DELETE FROM kinks where lovers_id = ?""", self.discord_id
-                )
-                await cur.execute(
-                    """DELETE FROM lovers WHERE discord_id = ?""", self.discord_id)
-                await db.commit()
+            # All three deletes commit together.
+            async with immediate_transaction(conn=db):
+                async with db.cursor() as cur:
+                    # remove from partner tables
+                    await cur.execute(
+                        """DELETE FROM partners WHERE lovers_id = ?""", self.discord_id
+                    )
+                    await cur.execute(
+                        """DELETE FROM kinks where lovers_id = ?""", self.discord_id
+                    )
+                    await cur.execute(
+                        """DELETE FROM lovers WHERE discord_id = ?""", self.discord_id)
 
-                return cur.get_cursor().rowcount
+                    return cur.get_cursor().rowcount
 
     # async def update_lover(self, name: str, role: int, position: int, role_switching: bool = False, position_switching: bool = False) -> LoverEntry:
     async def update_lover(self, args: dict[str, int | bool]) -> Self:
@@ -17,13 +17,14 @@ import discord
 import psutil
 from discord import Interaction, app_commands
 from discord.ext import commands
-from util.utils import count_lines, count_others
+from util.reloader import ReloadReport
+from util.utils import CodeStats, code_stats
 
 # Local libs
 if TYPE_CHECKING:
     from main import MrFriendly
 
-from database import Settings
+from database import BackupReport, MaintenanceReport, Settings, list_backups
 from loader import *
 
 # TODO - Write get log function.
@@ -103,23 +104,101 @@ class Util(commands.Cog):
     async def autocomplete_event_list(self, interaction: Interaction, current: str) -> list[app_commands.Choice[str]]:
         return [app_commands.Choice(name= entry, value= entry) for entry in self._event_list if current.lower() in entry.lower()][:25]
 
-    @commands.hybrid_command(name='reload', help="Reload all cogs.")
+    @commands.hybrid_command(name='reload', help="Reload changed modules, or all cogs with `full`.")
     @commands.is_owner()
-    async def reload(self, context: commands.Context) -> None:
+    @app_commands.describe(full="Reload every cog instead of only what changed.")
+    async def reload(self, context: commands.Context, full: bool = False) -> None:
         """
-        Reloads all cogs inside the cogs folder.
+        Reloads the modules that changed since the last reload and everything depending on them.
+        With `full` every cog inside the cogs folder is reloaded instead.
         """
         await context.typing(ephemeral=True)
         assert context.guild
         _settings: Settings = self.bot._settings
+        if full is False:
+            try:
+                report: ReloadReport = await self.bot._handler.hot_reload()
+            except Exception as e:
+                self._logger.error(msg=traceback.format_exc())
+                return await context.send(content=f"We encountered an **Error** - \n`{e}` {traceback.format_exc()}", ephemeral=True)
+            return await context.send(content=f"{'**SUCCESS**' if len(report.failed) == 0 else '**ERROR**'} Hot Reload - \n{report}"[:2000], ephemeral=True)
+
         try:
-            await self.bot._handler.cog_auto_loader(reload=True)
+            _failed: dict[str, Exception] = await self.bot._handler.cog_auto_loader(reload=True)
         except Exception as e:
             self._logger.error(msg=traceback.format_exc())
-            await context.send(content=f"We encountered an **Error** - \n`{e}` {traceback.format_exc()}", ephemeral=True)
+            return await context.send(content=f"We encountered an **Error** - \n`{e}` {traceback.format_exc()}", ephemeral=True)
+
+        if len(_failed) != 0:
+            _errors: str = "\n".join(f"> **{cog}** - `{error}`" for cog, error in _failed.items())
+            return await context.send(content=f"We encountered an **Error** Reloading Cogs - \n{_errors}", ephemeral=True)
 
         await context.send(content=f'**SUCCESS** Reloading All Cogs ', ephemeral=True, delete_after=_settings.msg_timeout)
 
+    @commands.hybrid_command(name="memory", help="Shows what the bot keeps cached and the process memory.")
+    @commands.is_owner()
+    async def memory(self, context: commands.Context) -> None:
+        """
+        Reports the cache profile, cached guilds/members/users/messages and the process RSS.
+        """
+        _settings: Settings = self.bot._settings
+        _profile = self.bot._cache_profile
+        _process: psutil.Process = psutil.Process()
+        _rss: float = _process.memory_info().rss / 1024**2
+        _members: int = sum(len(guild.members) for guild in self.bot.guilds)
+        _member_count: int = sum(guild.member_count or 0 for guild in self.bot.guilds)
+
+        embed = discord.Embed(title="Memory Report", color=discord.Color.blurple())
+        embed.add_field(name="Cache Profile", value=f"**{_profile.name}**\nPresences: {_profile.presences}\nMember cache: {_profile.member_cache}"
+                        f"\nChunking: {_profile.chunk_guilds_at_startup}\nMax messages: {_profile.max_messages}")
+        embed.add_field(name="Cached", value=f"Guilds: {len(self.bot.guilds):,}\nMembers: {_members:,} / {_member_count:,}"
+                        f"\nUsers: {len(self.bot.users):,}\nMessages: {len(self.bot.cached_messages):,}")
+        embed.add_field(name="Process", value=f"RSS: {_rss:.2f} MiB")
+        await context.send(embed=embed, ephemeral=True, delete_after=_settings.msg_timeout)
+
+    @commands.hybrid_command(name="maintenance", help="Runs the database maintenance or shows the last report.")
+    @commands.is_owner()
+    @app_commands.describe(run="Run the maintenance now instead of showing the last report.")
+    async def maintenance(self, context: commands.Context, run: bool = False) -> None:
+        """
+        Shows the last SQLite maintenance report per database, `run` triggers a new one first.
+        """
+        _settings: Settings = self.bot._settings
+        if run is True:
+            await context.defer(ephemeral=True)
+            reports: list[MaintenanceReport] = await self.bot.run_database_maintenance()
+        else:
+            reports = list(self.bot._maintenance_reports.values())
+        if len(reports) == 0:
+            return await context.send(content="The database maintenance hasn't run yet, use `run` to start it.", ephemeral=True, delete_after=_settings.msg_timeout)
+
+        embed = discord.Embed(title="Database Maintenance", color=discord.Color.blurple())
+        for report in reports:
+            embed.add_field(name=report.database, value=str(report)[:1024], inline=False)
+        await context.send(embed=embed, ephemeral=True, delete_after=_settings.msg_timeout)
+
+    @commands.hybrid_command(name="backup", help="Backs up the databases or shows the last backup report.")
+    @commands.is_owner()
+    @app_commands.describe(run="Take a backup now instead of showing the last report.")
+    async def backup(self, context: commands.Context, run: bool = False) -> None:
+        """
+        Shows the last backup report and the stored snapshots per database, `run` takes a new backup first.
+        """
+        _settings: Settings = self.bot._settings
+        if run is True:
+            await context.defer(ephemeral=True)
+            reports: list[BackupReport] = await self.bot.run_database_backup()
+        else:
+            reports = list(self.bot._backup_reports.values())
+        if len(reports) == 0:
+            return await context.send(content="No backup has run yet, use `run` to take one.", ephemeral=True, delete_after=_settings.msg_timeout)
+
+        embed = discord.Embed(title="Database Backups", color=discord.Color.blurple())
+        for report in reports:
+            _stored: int = len(list_backups(database=report.database))
+            embed.add_field(name=f"{report.database} ({_stored} stored)", value=str(report)[:1024], inline=False)
+        await context.send(embed=embed, ephemeral=True, delete_after=_settings.msg_timeout)
+
     @commands.command(help="Shows info about the bot", aliases=["botinfo", "info", "bi"])
     @commands.guild_only()
     async def about(self, context: commands.Context):
@@ -142,13 +221,13 @@ class Util(commands.Cog):
 
         embed.add_field(name=f"{self.bot.user.name} info:", value=f"**Uptime:**\n{self._uptime}")
         embed.add_field(name="Process", value=f"{memory_usage:.2f} MiB\n{cpu_usage:.2f}% CPU")
-        try:
-            embed.add_field(name="Lines", value=f"Lines: {await count_lines('./', '.py'):,}"
-                f"\nFunctions: {await count_others('./', '.py', 'def '):,}"
-                f"\nClasses: {await count_others('./', '.py', 'class '):,}",
-            )
-        except (FileNotFoundError, UnicodeDecodeError):
-            pass
+        _stats: CodeStats = await code_stats(path=os.path.abspath("./"), filetype=".py")
+        embed.add_field(name="Lines", value=f"Lines: {_stats.lines:,}"
+            f"\nFunctions: {_stats.functions:,}"
+            f"\nClasses: {_stats.classes:,}",
+        )
+        _queue: dict[str, int | float] = self.bot._image_queue.stats()
+        embed.add_field(name="Image Queue", value=f"Depth: {_queue['depth']:,}\nInserted: {_queue['inserted']:,}\nDropped: {_queue['dropped']:,}")
         embed.add_field(name="Heap", value= f"{app_mem}")
         # embed.add_field(name="Object Count", value=f"{objgraph.show_most_common_types(objects=[self._bot])}")
 
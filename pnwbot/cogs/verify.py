@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from sqlite3 import Row
 from typing import TYPE_CHECKING
@@ -5,8 +6,10 @@ from typing import TYPE_CHECKING
 from database import *
 from database.settings import Settings
 from discord import (CategoryChannel, Forbidden, Interaction, Member, Message,
-                     PermissionOverwrite, Reaction, Role, TextChannel,
-                     app_commands)
+                     PermissionOverwrite, RawReactionActionEvent,
+                     RawReactionClearEmojiEvent, RawReactionClearEvent,
+                     Reaction, Role, TextChannel, app_commands)
+from discord.abc import GuildChannel
 from discord.ext import commands
 from util.utils import MarkDownPlaceHolders, parse_markdown
 
@@ -20,22 +23,157 @@ class Verify(commands.Cog):
     
     def __init__(self, bot: "MrFriendly") -> None:
         self._bot: "MrFriendly" = bot
+        # Guild ID -> (Rules message ID, Member ID -> the emojis they reacted with on it)
+        self._rules_reactions: dict[int, tuple[int, dict[int, set[str]]]] = {}
+        # Guild ID -> (Rules message ID, reaction events buffered while `_build_rules_index` paginates)
+        self._rules_backfill: dict[int, tuple[int, list[tuple[str, int, str]]]] = {}
+        self._rules_indexing: dict[int, asyncio.Task[dict[int, set[str]] | None]] = {}  # Guild ID -> index being built
+        self._verify_channels: dict[tuple[int, int], int] = {}  # (Guild ID, Member ID) -> Verification channel ID
+        self._verify_members: dict[int, tuple[int, int]] = {}  # Verification channel ID -> (Guild ID, Member ID)
         self._logger.info(msg=f"{self.__class__.__name__} Cog has been loaded!")
-        
+
+    async def cog_load(self) -> None:
+        for entry in await VerifyChannel.get_verify_channels():
+            self._verify_channels[(entry.guild_id, entry.member_id)] = entry.channel_id
+            self._verify_members[entry.channel_id] = (entry.guild_id, entry.member_id)
+        self._bot._startup.defer(name="rules_reactions", func=self._backfill_rules_reactions)
+
+    async def _add_verify_channel(self, member: Member, channel: TextChannel) -> None:
+        await VerifyChannel.add_verify_channel(guild_id=member.guild.id, member_id=member.id, channel_id=channel.id)
+        _previous: int | None = self._verify_channels.get((member.guild.id, member.id))
+        if _previous is not None:
+            self._verify_members.pop(_previous, None)
+        self._verify_channels[(member.guild.id, member.id)] = channel.id
+        self._verify_members[channel.id] = (member.guild.id, member.id)
+
+    async def _remove_verify_channel(self, channel_id: int) -> None:
+        _key: tuple[int, int] | None = self._verify_members.pop(channel_id, None)
+        if _key is None:
+            return
+        self._verify_channels.pop(_key, None)
+        await VerifyChannel.remove_verify_channel(channel_id=channel_id)
+
+    @commands.Cog.listener("on_guild_channel_delete")
+    async def verify_on_channel_delete(self, channel: GuildChannel) -> None:
+        await self._remove_verify_channel(channel_id=channel.id)
+
+    async def _backfill_rules_reactions(self) -> None:
+        """
+        Builds the rules message reaction index for every guild, the raw reaction events keep it current afterwards.
+        """
+        for guild in self._bot.guilds:
+            try:
+                await self._index_rules_reactions(guild_id=guild.id)
+            except Exception as e:
+                self._logger.error(msg=f"Failed to index the rules message reactions. | Guild ID: {guild.id} | Error: {e}")
+
+    async def _index_rules_reactions(self, guild_id: int) -> dict[int, set[str]] | None:
+        """
+        Fetches every reaction on the guild's rules message once and stores who reacted with what.
+        Concurrent calls for the same guild share one fetch.
+
+        Returns:
+            dict[int, set[str]] | None: Member ID -> the emojis they reacted with, None if the rules channel is not set.
+        """
+        _task: asyncio.Task[dict[int, set[str]] | None] | None = self._rules_indexing.get(guild_id)
+        if _task is None:
+            _task = self._rules_indexing[guild_id] = asyncio.create_task(self._build_rules_index(guild_id=guild_id))
+            _task.add_done_callback(lambda _: self._rules_indexing.pop(guild_id, None))
+        return await _task
+
+    async def _build_rules_index(self, guild_id: int) -> dict[int, set[str]] | None:
+        _settings: Settings = await Settings.add_or_get_settings(guild_id=guild_id)
+        _guild = self._bot.get_guild(guild_id)
+        _rules_chan = _guild.get_channel(_settings.rules_channel_id) if _guild is not None else None
+        if not isinstance(_rules_chan, TextChannel):
+            return None
+
+        # Reaction events that arrive while we paginate are buffered in order and replayed on top of the result,
+        # the last event for a (member, emoji) wins no matter which page saw it.
+        _buffer: list[tuple[str, int, str]] = []
+        self._rules_backfill[guild_id] = (_settings.rules_message_id, _buffer)
+        try:
+            _rules_msg: Message = await _rules_chan.fetch_message(_settings.rules_message_id)
+            _reacted: dict[int, set[str]] = {}
+            for reaction in _rules_msg.reactions:
+                async for user in reaction.users():
+                    _reacted.setdefault(user.id, set()).add(str(reaction.emoji))
+        finally:
+            self._rules_backfill.pop(guild_id, None)
+        for action, user_id, emoji in _buffer:
+            self._apply_rules_reaction(reacted=_reacted, action=action, user_id=user_id, emoji=emoji)
+        self._rules_reactions[guild_id] = (_rules_msg.id, _reacted)
+        self._logger.info(msg=f"Indexed {len(_reacted)} rules message reactions. | Guild ID: {guild_id}")
+        return _reacted
+
+    @staticmethod
+    def _apply_rules_reaction(reacted: dict[int, set[str]], action: str, user_id: int = 0, emoji: str = "") -> None:
+        if action == "add":
+            reacted.setdefault(user_id, set()).add(emoji)
+        elif action == "remove":
+            _emojis: set[str] | None = reacted.get(user_id)
+            if _emojis is not None:
+                _emojis.discard(emoji)
+                if len(_emojis) == 0:
+                    del reacted[user_id]
+        elif action == "clear":
+            reacted.clear()
+        elif action == "clear_emoji":
+            for _user_id in list(reacted):
+                reacted[_user_id].discard(emoji)
+                if len(reacted[_user_id]) == 0:
+                    del reacted[_user_id]
+
+    def _on_rules_reaction(self, guild_id: int | None, message_id: int, action: str, user_id: int = 0, emoji: str = "") -> None:
+        """
+        Applies a raw reaction event to the rules index, or buffers it while that index is being built.
+        """
+        if guild_id is None:
+            return
+        _pending: tuple[int, list[tuple[str, int, str]]] | None = self._rules_backfill.get(guild_id)
+        if _pending is not None and _pending[0] == message_id:
+            _pending[1].append((action, user_id, emoji))
+            return
+        _entry: tuple[int, dict[int, set[str]]] | None = self._rules_reactions.get(guild_id)
+        if _entry is not None and _entry[0] == message_id:
+            self._apply_rules_reaction(reacted=_entry[1], action=action, user_id=user_id, emoji=emoji)
+
+    @commands.Cog.listener("on_raw_reaction_add")
+    async def rules_on_raw_reaction_add(self, payload: RawReactionActionEvent) -> None:
+        self._on_rules_reaction(guild_id=payload.guild_id, message_id=payload.message_id, action="add", user_id=payload.user_id, emoji=str(payload.emoji))
+
+    @commands.Cog.listener("on_raw_reaction_remove")
+    async def rules_on_raw_reaction_remove(self, payload: RawReactionActionEvent) -> None:
+        self._on_rules_reaction(guild_id=payload.guild_id, message_id=payload.message_id, action="remove", user_id=payload.user_id, emoji=str(payload.emoji))
+
+    @commands.Cog.listener("on_raw_reaction_clear")
+    async def rules_on_raw_reaction_clear(self, payload: RawReactionClearEvent) -> None:
+        self._on_rules_reaction(guild_id=payload.guild_id, message_id=payload.message_id, action="clear")
+
+    @commands.Cog.listener("on_raw_reaction_clear_emoji")
+    async def rules_on_raw_reaction_clear_emoji(self, payload: RawReactionClearEmojiEvent) -> None:
+        self._on_rules_reaction(guild_id=payload.guild_id, message_id=payload.message_id, action="clear_emoji", emoji=str(payload.emoji))
+
     @commands.Cog.listener("on_member_remove")
     async def verify_on_member_remove(self, member: Member) -> None:
-        _verify_category = member.guild.get_channel(1276028226166198394)
-        if not isinstance(_verify_category, CategoryChannel):
-            return
-        for channel in _verify_category.channels:
-            if not isinstance(channel, TextChannel):
+        _channel_id: int | None = self._verify_channels.get((member.guild.id, member.id))
+        _channel = member.guild.get_channel(_channel_id) if _channel_id is not None else None
+        if _channel_id is None:
+            # Channels made before we tracked them only have the member's ID as the topic.
+            _verify_category = member.guild.get_channel(1276028226166198394)
+            if not isinstance(_verify_category, CategoryChannel):
                 return
-            if channel.topic is not None and channel.topic == str(object=member.id):
-                try:
-                    self._logger.info(msg=f"{member.display_name} left the server prior to the verification process finishing.")
-                    await channel.delete(reason=f"{member.display_name} left the server prior to the verification process finishing.")
-                except Exception as e:
-                    self._logger.error(msg=f"Failed to remove Verification channel - {member.display_name} -> {channel.name}")
+            _channel = next((channel for channel in _verify_category.text_channels if channel.topic == str(object=member.id)), None)
+
+        if not isinstance(_channel, TextChannel):
+            if _channel_id is not None:
+                await self._remove_verify_channel(channel_id=_channel_id)
+            return
+        try:
+            self._logger.info(msg=f"{member.display_name} left the server prior to the verification process finishing.")
+            await _channel.delete(reason=f"{member.display_name} left the server prior to the verification process finishing.")
+        except Exception as e:
+            self._logger.error(msg=f"Failed to remove Verification channel - {member.display_name} -> {_channel.name}")
 
     @commands.Cog.listener("on_reaction_add")
     async def verify_on_reaction_add(self, reaction: Reaction, member: Member) -> None:
@@ -57,22 +195,15 @@ class Verify(commands.Cog):
         """
         Check's the rules message for a :thumbsup: emoji reaction from the discord.Member
         """
+        # We only care that the user has reacted; regardless of what reaction it is.
         _settings: Settings = await Settings.add_or_get_settings(guild_id=member.guild.id)
-        _rules_chan = member.guild.get_channel(_settings.rules_channel_id)
-        if not isinstance(_rules_chan, TextChannel):
-            return False
-        
-        _rules_msg: Message = await _rules_chan.fetch_message(_settings.rules_message_id)
-        # self._logger.warning(msg=f"**DEBUG** -- Checking {member.name} has reacted to rules message. {_rules_msg}")
-        for reaction in _rules_msg.reactions:
-            # We only care that the user has reacted; regardless of what reaction it is.
-            async for user in reaction.users():
-                if user == member:
-                    # self._logger.warning(msg=f"**DEBUG** -- Validating member match to reactions ->{user.id}  || {member.id}")
-                    return True
-            
-        return False
-    
+        _entry: tuple[int, dict[int, set[str]]] | None = self._rules_reactions.get(member.guild.id)
+        _reacted: dict[int, set[str]] | None = _entry[1] if _entry is not None and _entry[0] == _settings.rules_message_id else None
+        if _reacted is None:
+            # Not indexed yet or the rules message changed since.
+            _reacted = await self._index_rules_reactions(guild_id=member.guild.id)
+        return _reacted is not None and member.id in _reacted
+
     @commands.Cog.listener(name="on_member_join")
     async def user_verify_process(self, member: Member) -> None:
         """
@@ -122,6 +253,7 @@ class Verify(commands.Cog):
                 _overwrites[_mod_role] = PermissionOverwrite(read_message_history=True, read_messages=True, view_channel=True, send_messages=True, attach_files=True, manage_messages= True)
 
             usr_chan: TextChannel = await _verify_category.create_text_channel(name=f"__{member.display_name}__", position=0, topic=str(object=member.id), reason=f"Verifying {member.display_name}", overwrites=_overwrites)
+            await self._add_verify_channel(member=member, channel=usr_chan)
             await usr_chan.edit(overwrites= _overwrites)
             await usr_chan.send(content=f"{_mod_role.mention if _mod_role is not None else ''}")
             await usr_chan.send(content=f"{parse_markdown(path='../verify_intro.md', placeholder_struct=MarkDownPlaceHolders(member=member, settings=_settings))}")
@@ -133,9 +265,14 @@ class Verify(commands.Cog):
         assert context.guild
         _settings: Settings = await Settings.add_or_get_settings(guild_id=context.guild.id)
 
-        if isinstance(context.channel, TextChannel) and context.channel.topic is not None and context.guild is not None:
-            _content: str = f"Failed to Verify <@!{context.channel.topic}>"
-            _member: Member | None = context.guild.get_member(int(context.channel.topic))
+        _key: tuple[int, int] | None = self._verify_members.get(context.channel.id)
+        _member_id: int | None = _key[1] if _key is not None else None
+        if _member_id is None and isinstance(context.channel, TextChannel) and context.channel.topic is not None and context.channel.topic.isdigit():
+            _member_id = int(context.channel.topic)
+
+        if isinstance(context.channel, TextChannel) and _member_id is not None and context.guild is not None:
+            _content: str = f"Failed to Verify <@!{_member_id}>"
+            _member: Member | None = context.guild.get_member(_member_id)
             _verify_role: Role | None = context.guild.get_role(_settings.verified_role_id)
             _welcome_channel = context.guild.get_channel(_settings.welcome_channel_id)
             if _member is None:
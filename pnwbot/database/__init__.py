@@ -8,7 +8,11 @@ __credits__ = "k8thekat and LightningTH"
 
 from typing import Literal, NamedTuple
 
+from .archive import *
+from .backup import *
 from .base import *
+from .ingest import *
+from .maintenance import *
 from .settings import *
 from .user import *
 
@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from sqlite3 import Row
+from typing import Any, Callable, Mapping
+
+from .base import Base, DB_Pool
+
+__all__: tuple[str, ...] = ("ArchiveReport", "ARCHIVE_AGES", "ARCHIVE_DIR", "run_archival", "get_archived", "restore_archived_images", "ages_from_config")
+
+_logger: logging.Logger = logging.getLogger()
+
+ARCHIVE_DIR: Path = Path(__file__).parent.joinpath("archive")
+DISCORD_EPOCH: int = 1420070400000  # Milliseconds, the start of Discord snowflake timestamps.
+
+
+def _snowflake_time(snowflake: int) -> float:
+    return ((snowflake >> 22) + DISCORD_EPOCH) / 1000
+
+
+def _time_snowflake(timestamp: float) -> int:
+    return (int(timestamp * 1000) - DISCORD_EPOCH) << 22
+
+
+def _partition(timestamp: float) -> str:
+    """
+    The month a row belongs to, eg. `2024-08`.
+    """
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m")
+
+
+@dataclass(frozen=True)
+class _ArchiveTable():
+    name: str
+    select: str  # Rows older than the cutoff (?) with their rowid as `_rowid`, limited to a batch (?).
+    timestamp: Callable[[dict[str, Any]], float]  # Row -> when it was created, picks the partition.
+    key: Callable[[dict[str, Any]], Any]  # Row -> what identifies it, the same fields as the model's `__eq__`. A row archived twice is read back once.
+    cutoff: Callable[[float], float | int] = lambda timestamp: timestamp  # Cutoff timestamp -> the value compared in `select`.
+
+
+_TABLES: dict[str, _ArchiveTable] = {
+    "user_leaves": _ArchiveTable(
+        name="user_leaves",
+        select="""SELECT rowid AS _rowid, * FROM user_leaves WHERE created_at < ? ORDER BY created_at LIMIT ?""",
+        timestamp=lambda row: row["created_at"],
+        key=lambda row: (row["user_id"], row["created_at"])),
+    "infractions": _ArchiveTable(
+        name="infractions",
+        select="""SELECT rowid AS _rowid, * FROM infractions WHERE created_at < ? ORDER BY created_at LIMIT ?""",
+        timestamp=lambda row: row["created_at"],
+        key=lambda row: (row["user_id"], row["reason_msg_link"])),
+    # Only cleaned users, an unclean user's images are still work for the cleanup pipeline.
+    # There is no created_at column, the message ID is a snowflake with the time in it.
+    "user_images": _ArchiveTable(
+        name="user_images",
+        select="""SELECT user_images.rowid AS _rowid, user_images.* FROM user_images JOIN users ON users.user_id = user_images.user_id
+        WHERE users.cleaned = 1 AND user_images.message_id < ? ORDER BY user_images.message_id LIMIT ?""",
+        timestamp=lambda row: _snowflake_time(row["message_id"]),
+        key=lambda row: (row["channel_id"], row["message_id"]),
+        cutoff=_time_snowflake),
+}
+
+# Table -> how old a row has to be before it moves to the archive.
+ARCHIVE_AGES: dict[str, timedelta] = {
+    "user_leaves": timedelta(days=365),
+    "infractions": timedelta(days=365),
+    "user_images": timedelta(days=90),
+}
+
+
+def ages_from_config(section: Mapping[str, str] | None) -> dict[str, timedelta]:
+    """
+    Builds the table ages from the `[ARCHIVE]` section of our config, `<table> = <days>` with `0` to not archive that table.
+    Tables left out keep their `ARCHIVE_AGES` default.
+    """
+    ages: dict[str, timedelta] = dict(ARCHIVE_AGES)
+    if section is None:
+        return ages
+    for name, value in section.items():
+        if name not in _TABLES:
+            _logger.warning(msg=f"Unknown archive table `{name}` in the config. | Tables: {', '.join(_TABLES)}")
+            continue
+        try:
+            days: int = int(value)
+        except ValueError:
+            _logger.warning(msg=f"Archive age for `{name}` is not a number of days, using the default. | Value: {value}")
+            continue
+        if days <= 0:
+            ages.pop(name, None)
+        else:
+            ages[name] = timedelta(days=days)
+    return ages
+
+
+@dataclass
+class ArchiveReport():
+    started_at: datetime = field(default_factory=datetime.now)
+    rows: dict[str, int] = field(default_factory=dict)  # Table -> rows archived
+    partitions: dict[str, set[str]] = field(default_factory=dict)  # Table -> partitions written to
+    bytes_written: int = 0
+    finished: bool = True  # False if the time budget ran out with rows left to archive.
+    seconds: float = 0
+
+    def __str__(self) -> str:
+        _tables: str = "\n".join(f"> {table}: {rows:,} rows -> {', '.join(sorted(self.partitions.get(table, ()))) or '-'}" for table, rows in self.rows.items())
+        return (f"{'Finished' if self.finished else 'Paused'} in {self.seconds:.2f}s | {sum(self.rows.values()):,} rows, "
+                f"{self.bytes_written / 1024:.1f} KiB written\n{_tables}")
+
+
+def _partition_path(archive_dir: Path, table: str, partition: str) -> Path:
+    return archive_dir.joinpath(table, f"{partition}.jsonl.gz")
+
+
+def _write_partitions(archive_dir: Path, table: str, partitions: dict[str, list[dict[str, Any]]]) -> int:
+    """
+    Appends the rows to their partition files as a new gzip member and fsyncs them before the rows are deleted.
+
+    Returns:
+        int: Compressed bytes written.
+    """
+    written: int = 0
+    for partition, rows in partitions.items():
+        path: Path = _partition_path(archive_dir=archive_dir, table=table, partition=partition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("ab") as raw:
+            _start: int = raw.tell()
+            with gzip.GzipFile(fileobj=raw, mode="ab", compresslevel=9) as file:
+                file.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows).encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+            written += raw.tell() - _start
+    return written
+
+
+def _read_partitions(paths: list[Path], match: Callable[[dict[str, Any]], bool], key: Callable[[dict[str, Any]], Any]) -> list[dict[str, Any]]:
+    """
+    Files are append only, a row written more than once (see `_archive_batch`) is returned once, the last copy wins.
+    """
+    rows: dict[Any, dict[str, Any]] = {}
+    for path in paths:
+        if path.exists() is False:
+            continue
+        with gzip.open(path, "rt") as file:
+            for line in file:
+                row: dict[str, Any] = json.loads(line)
+                if match(row):
+                    rows[key(row)] = row
+    return list(rows.values())
+
+
+def _rows_by_rowid(res: list[Row]) -> dict[int, dict[str, Any]]:
+    rows: dict[int, dict[str, Any]] = {}
+    for row in res:
+        data: dict[str, Any] = dict(zip(row.keys(), row))
+        rows[data.pop("_rowid")] = data
+    return rows
+
+
+async def _archive_batch(table: _ArchiveTable, cutoff: float, batch_size: int, archive_dir: Path, report: ArchiveReport) -> int:
+    """
+    Moves one batch of old rows into the archive.
+
+    The batch is read and written to its partition files without the write lock. A short transaction then reads the batch
+    again and only counts and deletes the rows that are still there, unchanged and old enough, the rest stay in the table.
+    A row left behind, or kept by a crash before that transaction, is written again by a later batch, `get_archived` reads it once.
+
+    Returns:
+        int: Rows archived.
+    """
+    async with DB_Pool().connect() as conn:
+        res: list[Row] = await conn.fetchall(table.select, (table.cutoff(cutoff), batch_size))
+    if len(res) == 0:
+        return 0
+    written: dict[int, dict[str, Any]] = _rows_by_rowid(res=res)
+    partitions: dict[str, list[dict[str, Any]]] = {}
+    for data in written.values():
+        partitions.setdefault(_partition(table.timestamp(data)), []).append(data)
+    report.bytes_written += await asyncio.to_thread(_write_partitions, archive_dir, table.name, partitions)
+
+    async with Base.transaction() as conn:
+        res = await conn.fetchall(table.select, (table.cutoff(cutoff), batch_size))
+        archived: dict[int, dict[str, Any]] = {rowid: data for rowid, data in _rows_by_rowid(res=res).items() if written.get(rowid) == data}
+        if len(archived) == 0:
+            return 0
+        counts: dict[str, int] = {}
+        for data in archived.values():
+            _month: str = _partition(table.timestamp(data))
+            counts[_month] = counts.get(_month, 0) + 1
+        await conn.executemany("""INSERT INTO archive_partitions(table_name, month, rows) VALUES(?, ?, ?)
+                               ON CONFLICT(table_name, month) DO UPDATE SET rows = rows + excluded.rows""",
+                               [(table.name, partition, count) for partition, count in counts.items()])
+        await conn.executemany("""INSERT OR IGNORE INTO archive_partition_users(table_name, month, user_id) VALUES(?, ?, ?)""",
+                               list({(table.name, _partition(table.timestamp(data)), data["user_id"]) for data in archived.values()}))
+        await conn.execute(f"""DELETE FROM {table.name} WHERE rowid IN ({", ".join("?" * len(archived))})""", tuple(archived))
+
+    report.partitions.setdefault(table.name, set()).update(counts)
+    return len(archived)
+
+
+async def run_archival(ages: dict[str, timedelta] | None = None, batch_size: int = 2000, time_budget: float = 60.0,
+                       archive_dir: Path = ARCHIVE_DIR) -> ArchiveReport:
+    """
+    Moves rows older than their table's age out of `user_leaves`, `infractions` and (cleaned users') `user_images`
+    into gzipped JSON lines files, one per table and month, in batches of `batch_size` rows.
+
+    Args:
+        ages (dict[str, timedelta] | None): Table -> age, defaults to `ARCHIVE_AGES`. Tables left out are not archived.
+        time_budget (float): Seconds the run may take, checked between batches. The next run carries on.
+
+    Returns:
+        ArchiveReport: Rows archived per table and the partitions they went to.
+    """
+    report: ArchiveReport = ArchiveReport()
+    _start: float = time.perf_counter()
+    _deadline: float = time.monotonic() + time_budget
+    for name, age in (ages if ages is not None else ARCHIVE_AGES).items():
+        table: _ArchiveTable | None = _TABLES.get(name)
+        if table is None:
+            _logger.warning(msg=f"Unknown archive table `{name}`. | Tables: {', '.join(_TABLES)}")
+            continue
+        cutoff: float = (datetime.now() - age).timestamp()
+        report.rows[name] = 0
+        while True:
+            if time.monotonic() >= _deadline:
+                report.finished = False
+                break
+            archived: int = await _archive_batch(table=table, cutoff=cutoff, batch_size=batch_size, archive_dir=archive_dir, report=report)
+            report.rows[name] += archived
+            if archived < batch_size:
+                break
+    report.seconds = time.perf_counter() - _start
+    return report
+
+
+async def _user_partitions(table: str, user_id: int) -> list[str]:
+    async with DB_Pool().connect() as conn:
+        res: list[Row] = await conn.fetchall("""SELECT month FROM archive_partition_users WHERE table_name = ? AND user_id = ?""", (table, user_id))
+    return [row["month"] for row in res]
+
+
+async def get_archived(table: str, user_id: int, before: datetime | None = None, archive_dir: Path = ARCHIVE_DIR,
+                       **match: Any) -> list[dict[str, Any]]:
+    """
+    A user's archived rows of a table, only the partitions that user has rows in are read.
+
+    Args:
+        before (datetime | None): Only rows created at or before this.
+        **match: Extra column values the rows must have, eg. `guild_id=...`.
+
+    Returns:
+        list[dict[str, Any]]: The rows as column -> value, the same shape as the hot table.
+    """
+    _table: _ArchiveTable = _TABLES[table]
+    partitions: list[str] = await _user_partitions(table=table, user_id=user_id)
+    _before: float | None = before.timestamp() if before is not None else None
+    if _before is not None:
+        partitions = [partition for partition in partitions if partition <= _partition(_before)]
+    if len(partitions) == 0:
+        return []
+
+    def _match(row: dict[str, Any]) -> bool:
+        return (row["user_id"] == user_id and (_before is None or _table.timestamp(row) <= _before)
+                and all(row.get(column) == value for column, value in match.items()))
+
+    return await asyncio.to_thread(_read_partitions, [_partition_path(archive_dir=archive_dir, table=table, partition=partition) for partition in partitions], _match, _table.key)
+
+
+async def restore_archived_images(user_id: int, guild_id: int, archive_dir: Path = ARCHIVE_DIR) -> int:
+    """
+    Moves a user's archived `user_images` rows back into the hot table, so the cleanup pipeline sees them again
+    once the user is no longer cleaned (they left or were banned).
+
+    The partition files are read before the (short) transaction, don't call this inside a `Base.transaction()`.
+    The rows stay in the files, the user is dropped from those partitions and their row counts go down.
+    Restored rows get a new id, the archived one may belong to another row by now. A message already in the table is skipped.
+
+    Returns:
+        int: Rows restored.
+    """
+    _table: _ArchiveTable = _TABLES["user_images"]
+    rows: list[dict[str, Any]] = await get_archived(table=_table.name, user_id=user_id, archive_dir=archive_dir, guild_id=guild_id)
+    if len(rows) == 0:
+        return 0
+    counts: dict[str, int] = {}
+    for row in rows:
+        _month: str = _partition(_table.timestamp(row))
+        counts[_month] = counts.get(_month, 0) + 1
+    async with Base.transaction() as conn:
+        await conn.executemany("""INSERT INTO user_images(user_id, guild_id, channel_id, message_id) SELECT ?, ?, ?, ?
+                               WHERE NOT EXISTS (SELECT 1 FROM user_images WHERE channel_id = ? AND message_id = ?)""",
+                               [(row["user_id"], row["guild_id"], row["channel_id"], row["message_id"], row["channel_id"], row["message_id"]) for row in rows])
+        await conn.executemany("""UPDATE archive_partitions SET rows = MAX(rows - ?, 0) WHERE table_name = ? AND month = ?""",
+                               [(count, _table.name, partition) for partition, count in counts.items()])
+        await conn.execute("""DELETE FROM archive_partition_users WHERE table_name = ? AND user_id = ?""", (_table.name, user_id))
+    return len(rows)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import shutil
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+__all__: tuple[str, ...] = ("BackupReport", "backup_database", "restore_database", "list_backups", "BACKUP_DIR")
+
+_logger: logging.Logger = logging.getLogger()
+
+BACKUP_DIR: Path = Path(__file__).parent.joinpath("backups")
+_SUFFIX: str = ".sqlite.gz"
+
+
+def _mib(size: int) -> str:
+    return f"{size / 1024**2:.2f} MiB"
+
+
+@dataclass
+class BackupReport():
+    database: str
+    path: Path | None = None  # The compressed snapshot.
+    created_at: datetime = field(default_factory=datetime.now)
+    pages: int = 0
+    steps: int = 0
+    size: int = 0  # Bytes of the uncompressed snapshot.
+    compressed_size: int = 0
+    verified: bool = False  # `PRAGMA integrity_check` passed on the snapshot.
+    rotated: list[str] = field(default_factory=list)  # Old snapshots removed.
+    backup_seconds: float = 0
+    seconds: float = 0
+    error: str | None = None
+
+    def __str__(self) -> str:
+        if self.error is not None:
+            return f"Failed after {self.seconds:.2f}s | Error: {self.error}"
+        _ratio: float = self.compressed_size / self.size if self.size != 0 else 0
+        return (f"{self.path.name if self.path is not None else '?'} in {self.seconds:.2f}s (copy {self.backup_seconds:.2f}s, {self.steps} steps)\n"
+                f"Size: {_mib(self.size)} -> {_mib(self.compressed_size)} ({_ratio:.0%}) | Verified: {self.verified}"
+                + (f"\nRotated: {', '.join(self.rotated)}" if len(self.rotated) != 0 else ""))
+
+
+def _integrity_check(path: Path) -> str:
+    conn: sqlite3.Connection = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _copy(source: Path, target: Path, pages: int, pause: float, report: BackupReport) -> None:
+    """
+    Copies `source` into `target` with the online backup API, `pages` at a time with `pause` seconds between steps
+    so writers on the live database are never locked out for long.
+    """
+    def _progress(status: int, remaining: int, total: int) -> None:
+        report.steps += 1
+        report.pages = total
+        if remaining != 0 and pause > 0:
+            time.sleep(pause)
+
+    _source: sqlite3.Connection = sqlite3.connect(source.as_posix(), isolation_level=None)
+    _target: sqlite3.Connection = sqlite3.connect(target.as_posix())
+    try:
+        # Hold one read transaction for the whole copy. In WAL mode that pins a snapshot, without it every write
+        # from the bot between two steps restarts the backup from the first page.
+        _source.execute("BEGIN")
+        _source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        _source.backup(_target, pages=pages, progress=_progress)
+        _source.execute("COMMIT")
+    finally:
+        _target.close()
+        _source.close()
+
+
+def _compress(source: Path, target: Path) -> None:
+    with source.open("rb") as _in, gzip.open(target, "wb", compresslevel=6) as _out:
+        shutil.copyfileobj(_in, _out, length=1024**2)
+
+
+def _decompress(source: Path, target: Path) -> None:
+    with gzip.open(source, "rb") as _in, target.open("wb") as _out:
+        shutil.copyfileobj(_in, _out, length=1024**2)
+
+
+def list_backups(database: str, backup_dir: Path = BACKUP_DIR) -> list[Path]:
+    """
+    The snapshots of a database file name, newest first.
+    """
+    return sorted(backup_dir.glob(f"{Path(database).stem}-*{_SUFFIX}"), reverse=True)
+
+
+def _backup(source: Path, backup_dir: Path, pages: int, pause: float, keep: int, report: BackupReport) -> None:
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    _name: str = f"{source.stem}-{report.created_at:%Y%m%d-%H%M%S}"
+    _raw: Path = backup_dir.joinpath(f"{_name}.sqlite.tmp")
+    _final: Path = backup_dir.joinpath(f"{_name}{_SUFFIX}")
+    try:
+        _start: float = time.perf_counter()
+        _copy(source=source, target=_raw, pages=pages, pause=pause, report=report)
+        report.backup_seconds = time.perf_counter() - _start
+        report.size = _raw.stat().st_size
+
+        _check: str = _integrity_check(path=_raw)
+        if _check != "ok":
+            raise sqlite3.DatabaseError(f"integrity_check on the snapshot returned `{_check}`")
+        report.verified = True
+
+        _compress(source=_raw, target=_final)
+        report.path = _final
+        report.compressed_size = _final.stat().st_size
+    finally:
+        _raw.unlink(missing_ok=True)
+
+    for old in list_backups(database=source.name, backup_dir=backup_dir)[keep:]:
+        old.unlink(missing_ok=True)
+        report.rotated.append(old.name)
+
+
+async def backup_database(source: Path, backup_dir: Path = BACKUP_DIR, pages: int = 256, pause: float = 0.005, keep: int = 7) -> BackupReport:
+    """
+    Snapshots a live SQLite database with the online backup API, checks the copy with `PRAGMA integrity_check`,
+    gzips it into `backup_dir` and removes all but the newest `keep` snapshots of that database.
+
+    The work runs in a worker thread, the backup is copied `pages` at a time with `pause` seconds between steps,
+    so neither the event loop nor the bot's own writes wait on it.
+
+    Returns:
+        BackupReport: Where the snapshot went, how long it took and how large it is.
+    """
+    report: BackupReport = BackupReport(database=source.name)
+    _start: float = time.perf_counter()
+    if source.exists() is False:
+        report.error = "no database file"
+        return report
+    try:
+        await asyncio.to_thread(_backup, source, backup_dir, pages, pause, keep, report)
+    except Exception as e:
+        report.error = str(e)
+        _logger.error(msg=f"Failed to back up {source.name}. | Error: {e}")
+    report.seconds = time.perf_counter() - _start
+    return report
+
+
+def _restore(archive: Path, target: Path, pages: int) -> None:
+    _raw: Path = archive.with_name(archive.name.removesuffix(_SUFFIX) + ".restore.tmp")
+    try:
+        _decompress(source=archive, target=_raw)
+        _check: str = _integrity_check(path=_raw)
+        if _check != "ok":
+            raise sqlite3.DatabaseError(f"integrity_check on {archive.name} returned `{_check}`, the database was not touched")
+        # Copying through the backup API keeps the target's WAL and locks consistent for any open connection.
+        _copy(source=_raw, target=target, pages=pages, pause=0, report=BackupReport(database=target.name))
+        _check = _integrity_check(path=target)
+        if _check != "ok":
+            raise sqlite3.DatabaseError(f"integrity_check on {target.name} after the restore returned `{_check}`")
+    finally:
+        _raw.unlink(missing_ok=True)
+
+
+async def restore_database(archive: Path, target: Path, pages: int = 1024) -> None:
+    """
+    Restores a snapshot made by `backup_database` over `target`.
+
+    The snapshot is decompressed and must pass `PRAGMA integrity_check` before `target` is touched,
+    and `target` is checked again afterwards. Stop anything writing to `target` first.
+
+    Raises:
+        sqlite3.DatabaseError: If either integrity check fails.
+    """
+    await asyncio.to_thread(_restore, archive, target, pages)
+    _logger.info(msg=f"Restored {target.name} from {archive.name}.")
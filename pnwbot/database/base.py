@@ -1,54 +1,117 @@
+import asyncio
 import logging
-import re
 import sqlite3
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
+from contextvars import ContextVar
+from dataclasses import MISSING, dataclass, fields
+from operator import itemgetter
 from pathlib import Path
 from sqlite3 import Cursor, Row
-from typing import Any, Literal, Self
+from typing import Any, AsyncIterator, Callable, Literal, Self, TypeVar
 
 import util.asqlite as asqlite
 
-__all__: tuple[str, ...] = ("Base", "DB_Pool")
+from .lazy import lazy_timestamps
 
+__all__: tuple[str, ...] = ("Base", "DB_Pool", "lazy_timestamps", "immediate_transaction")
 
+M = TypeVar("M")
 
-@dataclass
-class VersionInfo():
-    major: int = 0
-    minor: int = 0
-    revision: int = 0
-    level: str = "release"
-    
-    @staticmethod
-    def _parse_version() -> "VersionInfo":
-        """
-        Get's the version information from the database `__init__.py`.
+# (Task, Connection) of the `Base.transaction()` open in the current task.
+# Tasks created inside a transaction inherit the value, so the owning task is checked before the connection is reused.
+_transaction: ContextVar[tuple[asyncio.Task | None, asqlite.Connection] | None] = ContextVar("_transaction", default=None)
 
-        Returns:
-            VersionInfo: _description_
-        """
-        # Grab Version from __init__.py
-        version: str = ''
-        tmp = VersionInfo()
-        with open(file='pnwbot/database/__init__.py') as file:
-            version = re.search(pattern=r'^__version__\s*=\s*[\'"]([^\'"]*)[\'"]', string=file.read(), flags=re.MULTILINE).group(1).split(".")  # type:ignore
-        tmp.major = int(version[0])
-        tmp.minor = int(version[1])
-        tmp.revision = int(version[2])
-        return tmp
-        
-    def __hash__(self) -> int:
-        return hash((self.major, self.minor, self.revision, self.level))
-
-    def __eq__(self, other: "VersionInfo") -> Any | Literal[False]:
-        try:
-            return (self.major == other.major) and (self.minor == other.minor) and (self.revision == other.revision) and (self.level == other.level)
-        except AttributeError:
-            return False
-        
-    def __str__(self) -> str:
-        return f"{self.major}.{self.minor}.{self.revision}-{self.level}"
+
+def _pinned_connection() -> asqlite.Connection | None:
+    pinned: tuple[asyncio.Task | None, asqlite.Connection] | None = _transaction.get()
+    if pinned is None or pinned[0] is not asyncio.current_task():
+        return None
+    return pinned[1]
+
+
+@asynccontextmanager
+async def immediate_transaction(conn: asqlite.Connection) -> AsyncIterator[asqlite.Connection]:
+    """
+    Runs the block in a `BEGIN IMMEDIATE` transaction on `conn`, committing once at the end or rolling back on any error.
+
+    `IMMEDIATE` takes the write lock up front, so a read followed by a write can't fail half way with `SQLITE_BUSY`.
+    """
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        await conn.rollback()
+        raise
+    await conn.commit()
+
+
+# (Model, SQL) -> row factory, built the first time a statement loads a model.
+_row_factories: dict[tuple[type, str], Callable[[sqlite3.Cursor, tuple[Any, ...]], Any]] = {}
+
+
+def _row_factory(model: type[M], SQL: str, description: tuple[tuple[Any, ...], ...]) -> Callable[[sqlite3.Cursor, tuple[Any, ...]], M]:
+    """
+    Builds a sqlite3 row factory that passes a row straight to the `model` constructor positionally.
+
+    The statement's column names are checked against the model's fields once here,
+    every row after that is a single constructor call with no `sqlite3.Row` or kwargs dict in between.
+
+    Raises:
+        TypeError: The statement returns a column the model doesn't have or misses a field without a default.
+    """
+    factory: Callable[[sqlite3.Cursor, tuple[Any, ...]], M] | None = _row_factories.get((model, SQL))
+    if factory is not None:
+        return factory
+
+    columns: list[str] = [entry[0] for entry in description]
+    params: list[str] = [entry.name for entry in fields(model) if entry.init]  # type: ignore
+    unknown: list[str] = [column for column in columns if column not in params]
+    if len(unknown) != 0:
+        raise TypeError(f"{model.__name__} has no fields for the columns {unknown}. | SQL: {SQL}")
+    # Positional arguments can only leave out trailing fields, and only ones with defaults.
+    _used: int = max(params.index(column) for column in columns) + 1 if len(columns) != 0 else 0
+    _defaults: set[str] = {entry.name for entry in fields(model) if entry.default is not MISSING or entry.default_factory is not MISSING}  # type: ignore
+    missing: list[str] = [name for name in params if name not in columns and (params.index(name) < _used or name not in _defaults)]
+    if len(missing) != 0:
+        raise TypeError(f"The statement doesn't select the {model.__name__} fields {missing}. | SQL: {SQL}")
+
+    if columns == params[:_used]:
+        def factory(cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> M:
+            return model(*row)
+    else:
+        # The table's column order differs from the model's field order.
+        _getter = itemgetter(*(columns.index(name) for name in params[:_used]))
+
+        def factory(cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> M:
+            return model(*_getter(row))
+
+    _row_factories[(model, SQL)] = factory
+    return factory
+
+
+# Bump whenever `schema.sql` changes, databases below it re-run the schema script and the migrations up to it.
+SCHEMA_VERSION: int = 2
+
+
+async def _add_rules_channel_id(conn: asqlite.Connection) -> None:
+    # `settings` tables created before 0.0.2 have no `rules_channel_id`.
+    columns: list[Row] = await conn.fetchall("""PRAGMA table_info(settings)""")
+    if "rules_channel_id" not in {column["name"] for column in columns}:
+        await conn.execute("""ALTER TABLE settings ADD COLUMN rules_channel_id INTEGER DEFAULT 0""")
+
+
+async def _add_users_departed(conn: asqlite.Connection) -> None:
+    # `users.departed` marks members that left, the user cleanup only deletes their (and banned users') images.
+    columns: list[Row] = await conn.fetchall("""PRAGMA table_info(users)""")
+    if "departed" not in {column["name"] for column in columns}:
+        await conn.execute("""ALTER TABLE users ADD COLUMN departed INTEGER NOT NULL DEFAULT 0""")
+
+
+# Schema version -> the changes `CREATE ... IF NOT EXISTS` can't make, run after the schema script in version order.
+_MIGRATIONS: dict[int, Callable[[asqlite.Connection], Any]] = {
+    1: _add_rules_channel_id,
+    2: _add_users_departed,
+}
 
 
 class DB_Pool:
@@ -96,6 +159,11 @@ class DB_Pool:
     @asynccontextmanager
     async def connect(cls):
         """async with DB_Pool().connect() as db:"""
+        _pinned: asqlite.Connection | None = _pinned_connection()
+        if _pinned is not None:
+            # Inside `Base.transaction()`, everything runs on its connection.
+            yield _pinned
+            return
         self = cls
         await self.setup_pool()
         pool = self.get_pool()
@@ -116,6 +184,35 @@ class Base():
     SCHEMA_FILE_PATH: str = Path(dir).joinpath("schema.sql").as_posix()
     _logger: logging.Logger = logging.getLogger()
     pool: asqlite.Pool | None = None
+    # Models subclass this with `@dataclass(slots=True)`, no `__dict__` here keeps them slotted.
+    __slots__: tuple[str, ...] = ()
+
+    @classmethod
+    @asynccontextmanager
+    async def transaction(cls) -> AsyncIterator[asqlite.Connection]:
+        """
+        A unit of work, every statement in the block runs on one pooled connection under `BEGIN IMMEDIATE` and commits once.
+
+        Model methods called inside the block join it through `DB_Pool().connect()`, and so does a nested `transaction()`.
+        Keep Discord API calls out of the block, the write lock is held until it exits.
+
+        Example:
+            async with Base.transaction():
+                _user = await User.add_or_get_user(guild_id=guild_id, user_id=user_id)
+                await _user.update_cleaned(cleaned=False)
+                await _user.add_leave()
+        """
+        _pinned: asqlite.Connection | None = _pinned_connection()
+        if _pinned is not None:
+            yield _pinned
+            return
+        async with DB_Pool().connect() as conn:
+            token = _transaction.set((asyncio.current_task(), conn))
+            try:
+                async with immediate_transaction(conn=conn):
+                    yield conn
+            finally:
+                _transaction.reset(token)
 
     async def _fetchone(self, SQL: str, parameters: tuple[Any, ...] | dict[str, Any] | None = None) -> Row | None:
         """
@@ -127,10 +224,7 @@ class Base():
         Returns:
             Row | None: A Row.
         """
-        if self.pool is None:
-            self.pool = DB_Pool.get_pool()
-
-        async with self.pool.acquire() as conn:
+        async with DB_Pool().connect() as conn:
             if parameters is None:
                 return await conn.fetchone(SQL)
             else:
@@ -146,16 +240,84 @@ class Base():
         Returns:
             list[Row]: A list of Rows.
         """
-
-        if self.pool is None:
-            self.pool = DB_Pool.get_pool()
-
-        async with self.pool.acquire() as conn:
+        async with DB_Pool().connect() as conn:
             if parameters is None:
                 return await conn.fetchall(SQL)
             else:
                 return await conn.fetchall(SQL, parameters)
 
+    @classmethod
+    async def _fetch_models(cls, SQL: str, parameters: tuple[Any, ...] | dict[str, Any] | None = None, model: type[M] | None = None) -> list[M]:
+        """
+        Query for a list of models, each row is built straight into `model` (defaults to the calling class), see `_row_factory`.
+
+        Args:
+            SQL (str): The SQL query statement, the selected columns must be fields of `model`.
+
+        Returns:
+            list[M]: A list of models.
+        """
+        _model: type = model if model is not None else cls
+        async with DB_Pool().connect() as conn:
+            if parameters is None:
+                cursor: asqlite.Cursor = await conn.execute(SQL)
+            else:
+                cursor = await conn.execute(SQL, parameters)
+            _cursor: sqlite3.Cursor = cursor.get_cursor()
+            if _cursor.description is None:
+                return []
+            _cursor.row_factory = _row_factory(model=_model, SQL=SQL, description=_cursor.description)
+            return await cursor.fetchall()  # type: ignore
+
+    # Rows per `fetchmany` call for the `_iter_*` methods.
+    CHUNK_SIZE: int = 500
+
+    @classmethod
+    async def _iter_rows(cls, SQL: str, parameters: tuple[Any, ...] | dict[str, Any] | None = None, chunk_size: int | None = None,
+                         model: type[M] | None = None) -> AsyncIterator[Any]:
+        """
+        Streams the result of a query in `fetchmany` chunks instead of loading it all at once.
+
+        The connection is held until the iterator is exhausted or closed, so keep the work per row short
+        or break out early with `aclosing()`.
+
+        Args:
+            SQL (str): The SQL query statement.
+            chunk_size (int | None): Rows per `fetchmany` call, defaults to `CHUNK_SIZE`.
+            model (type | None): Build each row into this model, see `_row_factory`. Yields `Row`s if None.
+
+        Yields:
+            Row | M: One row or model at a time.
+        """
+        async with DB_Pool().connect() as conn:
+            if parameters is None:
+                cursor: asqlite.Cursor = await conn.execute(SQL)
+            else:
+                cursor = await conn.execute(SQL, parameters)
+            try:
+                _cursor: sqlite3.Cursor = cursor.get_cursor()
+                if _cursor.description is None:
+                    return
+                if model is not None:
+                    _cursor.row_factory = _row_factory(model=model, SQL=SQL, description=_cursor.description)
+                while True:
+                    rows: list[Any] = await cursor.fetchmany(chunk_size or cls.CHUNK_SIZE)
+                    if len(rows) == 0:
+                        break
+                    for row in rows:
+                        yield row
+            finally:
+                await cursor.close()
+
+    @classmethod
+    async def _iter_models(cls, SQL: str, parameters: tuple[Any, ...] | dict[str, Any] | None = None, chunk_size: int | None = None,
+                           model: type[M] | None = None) -> AsyncIterator[M]:
+        """
+        Streams a query as models (defaults to the calling class), see `_iter_rows`.
+        """
+        async for entry in cls._iter_rows(SQL=SQL, parameters=parameters, chunk_size=chunk_size, model=model if model is not None else cls):
+            yield entry
+
     async def _execute(self, SQL: str, parameters: tuple[Any, ...] | dict[str, Any] | None = None) -> Row | None:
         """
         Execute a SQL statement.
@@ -163,10 +325,7 @@ class Base():
         Args:
             SQL (str): The SQL statement.
         """
-        if self.pool is None:
-            self.pool = DB_Pool.get_pool()
-
-        async with self.pool.acquire() as conn:
+        async with DB_Pool().connect() as conn:
             if parameters is None:
                 res: asqlite.Cursor = await conn.execute(SQL)
             else:
@@ -180,10 +339,7 @@ class Base():
         Args:
             SQL (str): The SQL statement.
         """
-        if self.pool is None:
-            self.pool = DB_Pool.get_pool()
-
-        async with self.pool.acquire() as conn:
+        async with DB_Pool().connect() as conn:
             if parameters is None:
                 res: asqlite.Cursor = await conn.execute(SQL)
             else:
@@ -192,50 +348,26 @@ class Base():
 
     async def _create_tables(self) -> None:
         """
-        Creates the DATABASE tables from `SCHEMA_FILE_PATH`. \n
-
-        """
-        self._logger.info(msg=f"Initializing our Database...")
-        
-        with open(file=self.SCHEMA_FILE_PATH, mode="r") as f:
-            async with DB_Pool().connect() as conn:
-                async with conn.cursor() as cur:
-                    await cur.executescript(sql_script=f.read())
-
-        await self._check_update()
-
-
-    async def _check_update(self) -> Any | None:
-        """
-        Handles our Database alterations and updates.
+        Brings the DATABASE up to `SCHEMA_VERSION`. \n
+        An up to date database costs one `PRAGMA user_version` read, otherwise `SCHEMA_FILE_PATH` and the pending `_MIGRATIONS`
+        run in a single transaction together with the new `user_version`.
         """
-        self._logger.info(msg=f"Checking Database for updates...")
-        #check if the version table exists.
-        res: Row | None = await self._fetchone(SQL=f"""SELECT * FROM version""")
-        version: VersionInfo = VersionInfo()._parse_version()
-        if res is None:
-            # First update to add version support.
-            await self._execute(SQL=f"""INSERT INTO version(major, minor, revision, level) VALUES(?,?,?,?) RETURNING *""", 
-                        parameters=(version.major, version.minor, version.revision, version.level))
-            return await self._check_update()
-        e_version = VersionInfo(**res)
-        self._logger.info(msg=f"Found Database version {e_version}...")
-        
-        if e_version != version:
-            if version == VersionInfo(major=0, minor= 0, revision=2, level="release"):
-                self._logger.info(msg=f"Updating our Database from {e_version} to {version}...")
-                try:
-                    await self._execute(SQL="""ALTER TABLE settings ADD COLUMN rules_channel_id INTEGER DEFAULT 0""")
-                except sqlite3.OperationalError as e:
-                    pass
-                await self._execute(SQL=f"""UPDATE version SET major = ?, minor = ?, revision = ?""", parameters=(version.major, version.minor, version.revision))
-                await self._check_update()
-        
-      
-        else:
-            self._logger.info(msg=f"No Updates found, our Database is currently on version {e_version}...")
-        
-
-                
-       
-                
+        async with DB_Pool().connect() as conn:
+            current: int = (await conn.fetchone("""PRAGMA user_version"""))[0]
+            if current >= SCHEMA_VERSION:
+                return
+            self._logger.info(msg=f"Updating our Database schema from version {current} to {SCHEMA_VERSION}...")
+            with open(file=self.SCHEMA_FILE_PATH, mode="r") as f:
+                schema: str = f.read()
+            try:
+                # `executescript` commits any open transaction first, so the transaction is opened inside the script.
+                await conn.executescript(f"BEGIN IMMEDIATE;\n{schema}\n")
+                for version, migration in sorted(_MIGRATIONS.items()):
+                    if current < version <= SCHEMA_VERSION:
+                        self._logger.info(msg=f"Running Database migration {version} `{migration.__name__}`...")
+                        await migration(conn)
+                await conn.execute(f"""PRAGMA user_version = {int(SCHEMA_VERSION)}""")
+                await conn.commit()
+            except BaseException:
+                await conn.rollback()
+                raise
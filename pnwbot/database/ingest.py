@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from .base import Base
+
+__all__: tuple[str, ...] = ("ImageIngestQueue",)
+
+
+class ImageIngestQueue():
+    """
+    Collects `user_images` rows from the event path and inserts them in batches from a background task.
+
+    `enqueue()` never awaits, so `on_message` doesn't wait on SQLite for attachments.
+    The queue is bounded to `max_size` rows, anything past that is dropped and counted in `dropped`.
+    """
+    _logger: logging.Logger = logging.getLogger()
+
+    def __init__(self, max_size: int = 10_000, batch_size: int = 250, flush_interval: float = 1.0) -> None:
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval  # Seconds to wait for more rows before inserting a partial batch.
+        self._queue: asyncio.Queue[tuple[int, int, int, int]] = asyncio.Queue(maxsize=max_size)  # (user_id, guild_id, channel_id, message_id)
+        self._task: asyncio.Task | None = None
+        self._batch: list[tuple[int, int, int, int]] = []  # Rows taken off the queue for the next insert.
+        self._inflight: asyncio.Future | None = None
+        self._pending: set[tuple[int, int]] = set()  # (channel_id, message_id) queued but not inserted yet.
+        self._cancelled: set[tuple[int, int]] = set()  # Pending rows whose message was deleted before we inserted it.
+        self._closed: bool = False
+        self.inserted: int = 0
+        self.dropped: int = 0
+        self.batches: int = 0
+        self.last_batch_ms: float = 0
+
+    @property
+    def depth(self) -> int:
+        """
+        How many rows are waiting to be inserted.
+        """
+        return self._queue.qsize()
+
+    def stats(self) -> dict[str, int | float]:
+        return {"depth": self.depth, "inserted": self.inserted, "dropped": self.dropped, "batches": self.batches, "last_batch_ms": round(self.last_batch_ms, 2)}
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._closed = False
+            self._task = asyncio.create_task(self._consume(), name="image_ingest")
+
+    def enqueue(self, user_id: int, guild_id: int, channel_id: int, message_id: int) -> bool:
+        """
+        Queues an image row for insertion.
+
+        Returns:
+            bool: False if the queue is full or draining and the row was dropped.
+        """
+        if self._closed is True:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait((user_id, guild_id, channel_id, message_id))
+            self._pending.add((channel_id, message_id))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self._logger.warning(msg=f"Image ingest queue is full, dropped an image row. | Message ID: {message_id} Dropped: {self.dropped}")
+            return False
+        return True
+
+    def discard(self, channel_id: int, message_ids: list[int]) -> int:
+        """
+        Skips the queued rows of deleted messages, so a delete that beats the insert doesn't leave a stale row.
+
+        Returns:
+            int: How many queued rows will be skipped.
+        """
+        _keys: set[tuple[int, int]] = {(channel_id, message_id) for message_id in message_ids} & self._pending
+        self._cancelled.update(_keys)
+        return len(_keys)
+
+    async def _fill_batch(self) -> None:
+        self._batch.append(await self._queue.get())
+        _deadline: float = time.monotonic() + self.flush_interval
+        while len(self._batch) < self.batch_size:
+            _timeout: float = _deadline - time.monotonic()
+            if _timeout <= 0:
+                break
+            # Not `wait_for`, on 3.11 it can swallow a cancel that lands as `get()` returns and `drain()` would wait forever.
+            try:
+                async with asyncio.timeout(_timeout):
+                    self._batch.append(await self._queue.get())
+            except TimeoutError:
+                break
+
+    def _take_all(self) -> list[tuple[int, int, int, int]]:
+        batch: list[tuple[int, int, int, int]] = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _insert(self, batch: list[tuple[int, int, int, int]]) -> None:
+        _keys: list[tuple[int, int]] = [(row[2], row[3]) for row in batch]
+        try:
+            if len(self._cancelled) != 0:
+                batch = [row for row, key in zip(batch, _keys) if key not in self._cancelled]
+            if len(batch) == 0:
+                return
+            _start: float = time.perf_counter()
+            try:
+                async with Base.transaction() as conn:
+                    await conn.executemany("""INSERT INTO user_images(user_id, guild_id, channel_id, message_id) VALUES(?, ?, ?, ?)""", batch)
+                # The keys stay pending until the insert commits, a delete that arrived while we awaited is only in `_cancelled`.
+                _late: list[tuple[int, int]] = [(row[2], row[3]) for row in batch if (row[2], row[3]) in self._cancelled]
+                if len(_late) != 0:
+                    async with Base.transaction() as conn:
+                        await conn.executemany("""DELETE FROM user_images WHERE channel_id = ? AND message_id = ?""", _late)
+            except Exception as e:
+                self._logger.error(msg=f"Failed to insert a batch of {len(batch)} image rows. | Error: {e}")
+                return
+            self.inserted += len(batch) - len(_late)
+            self.batches += 1
+            self.last_batch_ms = (time.perf_counter() - _start) * 1000
+        finally:
+            self._pending.difference_update(_keys)
+            self._cancelled.difference_update(_keys)
+
+    async def _consume(self) -> None:
+        while True:
+            await self._fill_batch()
+            batch, self._batch = self._batch, []
+            # Shield the insert so a cancel from `drain()` can't lose a batch half way, `drain()` waits on it instead.
+            self._inflight = asyncio.ensure_future(self._insert(batch=batch))
+            await asyncio.shield(self._inflight)
+
+    async def drain(self) -> None:
+        """
+        Stops accepting rows, stops the consumer and inserts whatever is still queued.
+        """
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        _remaining: list[tuple[int, int, int, int]] = self._batch + self._take_all()
+        self._batch = []
+        for index in range(0, len(_remaining), self.batch_size):
+            await self._insert(batch=_remaining[index:index + self.batch_size])
+        self._logger.info(msg=f"Image ingest queue drained. | {self.stats()}")
@@ -0,0 +1,42 @@
+# Standard library only, `benchmarks/bench_models.py` loads this file without discord.py or the pool.
+from datetime import datetime
+from typing import Any, Callable, TypeVar
+
+__all__: tuple[str, ...] = ("lazy_timestamps",)
+
+T = TypeVar("T", bound=type)
+
+
+class _LazyTimestamp():
+    """
+    Wraps the slot of a dataclass field that is stored as a POSIX timestamp.
+    The raw value is kept until the attribute is first read, then it is converted to a `datetime` once and stored back.
+    """
+    __slots__: tuple[str, ...] = ("_slot",)
+
+    def __init__(self, slot: Any) -> None:
+        self._slot: Any = slot
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+        value: Any = self._slot.__get__(instance, owner)
+        if isinstance(value, (int, float)):
+            value = datetime.fromtimestamp(value)
+            self._slot.__set__(instance, value)
+        return value
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        self._slot.__set__(instance, value)
+
+
+def lazy_timestamps(*names: str) -> Callable[[T], T]:
+    """
+    Class decorator for `@dataclass(slots=True)` models, `names` are the fields holding timestamps from the database.
+    Apply it above `@dataclass` so the slots already exist.
+    """
+    def decorator(cls: T) -> T:
+        for name in names:
+            setattr(cls, name, _LazyTimestamp(slot=cls.__dict__[name]))
+        return cls
+    return decorator
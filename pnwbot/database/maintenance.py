@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import util.asqlite as asqlite
+
+__all__: tuple[str, ...] = ("DatabaseStats", "MaintenanceReport", "run_maintenance")
+
+_logger: logging.Logger = logging.getLogger()
+
+
+def _mib(size: int) -> str:
+    return f"{size / 1024**2:.2f} MiB"
+
+
+@dataclass(slots=True)
+class DatabaseStats():
+    size: int  # Bytes of the database file.
+    wal_size: int  # Bytes of the `-wal` file, 0 if there is none.
+    page_size: int
+    page_count: int
+    freelist_count: int  # Unused pages, only given back to the filesystem by a vacuum.
+
+    @property
+    def free_ratio(self) -> float:
+        return self.freelist_count / self.page_count if self.page_count != 0 else 0
+
+    @classmethod
+    async def collect(cls, conn: asqlite.Connection, path: Path) -> DatabaseStats:
+        _wal: Path = path.with_name(path.name + "-wal")
+        return cls(size=path.stat().st_size,
+                   wal_size=_wal.stat().st_size if _wal.exists() else 0,
+                   page_size=(await conn.fetchone("PRAGMA page_size"))[0],
+                   page_count=(await conn.fetchone("PRAGMA page_count"))[0],
+                   freelist_count=(await conn.fetchone("PRAGMA freelist_count"))[0])
+
+    def __str__(self) -> str:
+        return f"{_mib(self.size)} + WAL {_mib(self.wal_size)} | Free pages: {self.freelist_count:,}/{self.page_count:,} ({self.free_ratio:.1%})"
+
+
+@dataclass
+class MaintenanceReport():
+    database: str
+    started_at: datetime = field(default_factory=datetime.now)
+    before: DatabaseStats | None = None
+    after: DatabaseStats | None = None
+    steps: dict[str, float] = field(default_factory=dict)  # Step -> seconds, in run order.
+    skipped: dict[str, str] = field(default_factory=dict)  # Step -> why
+    errors: dict[str, str] = field(default_factory=dict)  # Step -> error
+    seconds: float = 0
+
+    def __str__(self) -> str:
+        _lines: list[str] = [f"Ran <t:{int(self.started_at.timestamp())}:R> in {self.seconds * 1000:.0f}ms"]
+        if self.before is not None:
+            _lines.append(f"Before: {self.before}")
+        if self.after is not None:
+            _lines.append(f"After: {self.after}")
+        if len(self.steps) != 0:
+            _lines.append("Steps: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.steps.items()))
+        if len(self.skipped) != 0:
+            _lines.append("Skipped: " + ", ".join(f"{name} ({reason})" for name, reason in self.skipped.items()))
+        if len(self.errors) != 0:
+            _lines.append("Errors: " + ", ".join(f"{name} `{error}`" for name, error in self.errors.items()))
+        return "\n".join(_lines)
+
+
+async def run_maintenance(path: Path, time_budget: float = 60.0, analysis_limit: int = 1000, vacuum_pages: int = 1024,
+                          convert_max_size: int = 64 * 1024**2) -> MaintenanceReport:
+    """
+    Runs `ANALYZE`, `PRAGMA optimize`, an incremental vacuum and a WAL checkpoint on a SQLite database, in that order,
+    on its own connection so the pool stays free.
+
+    A step that would start after `time_budget` seconds is skipped and shows up in the report.
+
+    Args:
+        path (Path): The database file.
+        time_budget (float): Seconds the run may take, checked between steps and between vacuum chunks.
+        analysis_limit (int): Rows `ANALYZE` samples per index, keeps it cheap on large tables.
+        vacuum_pages (int): Pages freed per `incremental_vacuum` call.
+        convert_max_size (int): Databases without `auto_vacuum = INCREMENTAL` are converted with a one time `VACUUM` up to this size in bytes.
+
+    Returns:
+        MaintenanceReport: The database stats before and after, and what each step took.
+    """
+    report: MaintenanceReport = MaintenanceReport(database=path.name)
+    if path.exists() is False:
+        report.skipped["all"] = "no database file"
+        return report
+
+    _start: float = time.perf_counter()
+    _deadline: float = time.monotonic() + time_budget
+    async with asqlite.connect(path.as_posix()) as conn:
+        report.before = await DatabaseStats.collect(conn=conn, path=path)
+
+        async def _step(name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+            if time.monotonic() >= _deadline:
+                report.skipped[name] = "time budget"
+                return None
+            _step_start: float = time.perf_counter()
+            try:
+                res: Any = await func()
+            except sqlite3.Error as e:
+                report.errors[name] = str(e)
+                _logger.error(msg=f"Database maintenance step `{name}` failed on {path.name}. | Error: {e}")
+                return None
+            report.steps[name] = report.steps.get(name, 0) + time.perf_counter() - _step_start
+            return res
+
+        await conn.execute(f"PRAGMA analysis_limit = {int(analysis_limit)}")
+        await _step(name="analyze", func=lambda: conn.execute("ANALYZE"))
+        await _step(name="optimize", func=lambda: conn.execute("PRAGMA optimize"))
+
+        _auto_vacuum: int = (await conn.fetchone("PRAGMA auto_vacuum"))[0]
+        if _auto_vacuum != 2:
+            # Incremental vacuum needs `auto_vacuum = INCREMENTAL`, which only takes effect after a full `VACUUM`.
+            if report.before.size <= convert_max_size:
+                await _step(name="auto_vacuum", func=lambda: conn.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;"))
+            else:
+                report.skipped["auto_vacuum"] = f"over {_mib(convert_max_size)}, run `PRAGMA auto_vacuum = INCREMENTAL; VACUUM;` offline"
+
+        if (await conn.fetchone("PRAGMA auto_vacuum"))[0] == 2:
+            while (await conn.fetchone("PRAGMA freelist_count"))[0] != 0:
+                if await _step(name="incremental_vacuum", func=lambda: conn.fetchall(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")) is None:
+                    break
+
+        if (await conn.fetchone("PRAGMA journal_mode"))[0] == "wal":
+            res: sqlite3.Row | None = await _step(name="wal_checkpoint", func=lambda: conn.fetchone("PRAGMA wal_checkpoint(TRUNCATE)"))
+            if res is not None and res[0] == 1:
+                report.errors["wal_checkpoint"] = f"busy, {res[2]}/{res[1]} frames checkpointed"
+
+        report.after = await DatabaseStats.collect(conn=conn, path=path)
+    report.seconds = time.perf_counter() - _start
+    return report
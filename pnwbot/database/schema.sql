@@ -1,11 +1,4 @@
-CREATE TABLE
-    IF NOT EXISTS version (
-        major INTEGER NOT NULL DEFAULT 0,
-        minor INTEGER NOT NULL DEFAULT 0,
-        revision INTEGER NOT NULL DEFAULT 0,
-        level TEXT NOT NULL
-    ) STRICT;
-
+-- The schema version is kept in `PRAGMA user_version`, see `SCHEMA_VERSION` in base.py. Bump it with any change here.
 CREATE TABLE
     IF NOT EXISTS guilds (guild_id INTEGER UNIQUE NOT NULL) STRICT;
 
@@ -44,6 +37,7 @@ CREATE TABLE
         last_active_at REAL NOT NULL,
         banned INTEGER NOT NULL DEFAULT 0,
         cleaned INTEGER NOT NULL DEFAULT 0,
+        departed INTEGER NOT NULL DEFAULT 0,
         FOREIGN KEY (guild_id) REFERENCES guilds (guild_id) ON DELETE CASCADE
     ) STRICT;
 
@@ -76,6 +70,36 @@ CREATE TABLE
         FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
     ) STRICT;
 
+CREATE INDEX IF NOT EXISTS user_images_channel_message ON user_images (channel_id, message_id);
+
+CREATE TABLE
+    IF NOT EXISTS cleanup_checkpoints (
+        guild_id INTEGER NOT NULL PRIMARY KEY,
+        last_image_id INTEGER NOT NULL DEFAULT 0,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        failed INTEGER NOT NULL DEFAULT 0,
+        started_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    ) STRICT;
+
+-- Rows moved out of `user_leaves`, `infractions` and `user_images` into `database/archive/<table>/<month>.jsonl.gz`.
+CREATE TABLE
+    IF NOT EXISTS archive_partitions (
+        table_name TEXT NOT NULL,
+        month TEXT NOT NULL,
+        rows INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, month)
+    ) STRICT;
+
+-- Which archive files hold rows of a user, so reading a user's history only opens those.
+CREATE TABLE
+    IF NOT EXISTS archive_partition_users (
+        table_name TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        month TEXT NOT NULL,
+        PRIMARY KEY (table_name, user_id, month)
+    ) STRICT, WITHOUT ROWID;
+
 CREATE TABLE
     IF NOT EXISTS role_embeds (
         id INTEGER PRIMARY KEY,
@@ -84,4 +108,35 @@ CREATE TABLE
         channel_id INTEGER NOT NULL,
         message_id INTEGER NOT NULL,
         UNIQUE (guild_id, channel_id, message_id)
+    ) STRICT;
+
+CREATE INDEX IF NOT EXISTS role_embeds_message_id ON role_embeds (message_id);
+
+CREATE INDEX IF NOT EXISTS role_embeds_channel_id ON role_embeds (channel_id);
+
+-- Roles in the same group are exclusive, picking one from a role embed removes the others.
+CREATE TABLE
+    IF NOT EXISTS role_groups (
+        id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        FOREIGN KEY (guild_id) REFERENCES guilds (guild_id) ON DELETE CASCADE,
+        UNIQUE (guild_id, name)
+    ) STRICT;
+
+CREATE TABLE
+    IF NOT EXISTS role_group_roles (
+        group_id INTEGER NOT NULL,
+        role_id INTEGER UNIQUE NOT NULL,
+        FOREIGN KEY (group_id) REFERENCES role_groups (id) ON DELETE CASCADE
+    ) STRICT;
+
+-- The verification channel `Verify` created for a member while they verify.
+CREATE TABLE
+    IF NOT EXISTS verify_channels (
+        guild_id INTEGER NOT NULL,
+        member_id INTEGER NOT NULL,
+        channel_id INTEGER UNIQUE NOT NULL,
+        FOREIGN KEY (guild_id) REFERENCES guilds (guild_id) ON DELETE CASCADE,
+        PRIMARY KEY (guild_id, member_id)
     ) STRICT;
\ No newline at end of file
@@ -1,19 +1,19 @@
 from __future__ import annotations
 
 import functools
-from dataclasses import InitVar, dataclass, fields
+from dataclasses import dataclass, field, fields
 from sqlite3 import Row
-from typing import Any, Optional, Self, Union
+from typing import Any, ClassVar, Optional, Self, Union
 
 import util.asqlite as asqlite
 from discord import CategoryChannel, TextChannel
 
 from .base import *
 
-__all__: tuple[str, ...] = ("Settings", "Role_Embed_Info",)
+__all__: tuple[str, ...] = ("Settings", "Role_Embed_Info", "Role_Group",)
 
 
-@dataclass
+@dataclass(slots=True)
 class Role_Embed_Info(Base):
     id: int
     name: str
@@ -21,10 +21,7 @@ class Role_Embed_Info(Base):
     channel_id: int
     message_id: int
 
-    _pool: InitVar[asqlite.Pool | None] = None
-
-    def __post_init__(self, _pool: asqlite.Pool | None = None) -> None:
-        self._fields: list[str] = [field.name for field in fields(class_or_instance=self)]
+    _fields: ClassVar[tuple[str, ...]]  # Set once below the class.
 
     @classmethod
     async def add_role_embeds(cls, name: str, guild_id: int, channel_id: int, message_id: int) -> Role_Embed_Info:
@@ -52,15 +49,48 @@ class Role_Embed_Info(Base):
             res: Row | None = await conn.fetchone("""DELETE FROM role_embeds WHERE id = ?""", (id,))
         return True if res is not None else False
 
+    @classmethod
+    async def remove_role_embeds_by_message(cls, message_ids: list[int]) -> int:
+        """
+        Removes the role embeds for any of the `message_ids`, used when Discord tells us the messages were deleted.
+
+        Returns:
+            int: How many role embeds were removed.
+        """
+        if len(message_ids) == 0:
+            return 0
+        async with DB_Pool().connect() as conn:
+            res: list[Row] = await conn.fetchall(f"""DELETE FROM role_embeds WHERE message_id IN ({", ".join("?" * len(message_ids))}) RETURNING id""",
+                                                 tuple(message_ids))
+        return len(res)
+
+    @classmethod
+    async def remove_role_embeds_by_channel(cls, channel_id: int) -> int:
+        """
+        Removes every role embed in a deleted channel.
+
+        Returns:
+            int: How many role embeds were removed.
+        """
+        async with DB_Pool().connect() as conn:
+            res: list[Row] = await conn.fetchall("""DELETE FROM role_embeds WHERE channel_id = ? RETURNING id""", (channel_id,))
+        return len(res)
+
+    @classmethod
+    async def get_every_role_embed(cls) -> list[Role_Embed_Info]:
+        """
+        Every role embed across all guilds, unlike `get_all_role_embeds` this doesn't raise when there are none.
+        """
+        return await cls._fetch_models(SQL="""SELECT * FROM role_embeds""")
+
     @classmethod
     async def get_all_role_embeds(cls, guild_id: int) -> list[Role_Embed_Info]:
         if len(str(guild_id)) < 15:
             raise ValueError("Your `guild_id` value is to short (<15)")
-        async with DB_Pool().connect() as conn:
-            res: list[Row] = await conn.fetchall("""SELECT * FROM role_embeds WHERE guild_id = ?""", (guild_id,))
+        res: list[Role_Embed_Info] = await cls._fetch_models(SQL="""SELECT * FROM role_embeds WHERE guild_id = ?""", parameters=(guild_id,))
         if len(res) == 0:
             raise ValueError(f"There is no entries in the `role_embeds` table for the Guild ID provided. | Guild ID: {guild_id}")
-        return [Role_Embed_Info(**info) for info in res]
+        return res
 
     @classmethod
     async def get_role_embed(cls, guild_id: int, id: int) -> Role_Embed_Info:
@@ -71,7 +101,60 @@ class Role_Embed_Info(Base):
         return Role_Embed_Info(**res)
 
 
-@dataclass
+Role_Embed_Info._fields = tuple(entry.name for entry in fields(Role_Embed_Info))
+
+
+@dataclass(slots=True)
+class Role_Group(Base):
+    id: int
+    guild_id: int
+    name: str
+    roles: set[int] = field(default_factory=set)
+
+    @classmethod
+    async def add_role_group(cls, guild_id: int, name: str) -> Role_Group:
+        async with DB_Pool().connect() as conn:
+            res: Row | None = await conn.fetchone("""INSERT INTO role_groups(guild_id, name) VALUES(?, ?)
+                                                ON CONFLICT(guild_id, name) DO NOTHING RETURNING *""", (guild_id, name))
+        if res is None:
+            raise ValueError(f"A Role Group with that name already exists. | Guild ID: {guild_id} Name: {name}")
+        return Role_Group(**res)
+
+    @classmethod
+    async def get_all_role_groups(cls) -> list[Role_Group]:
+        """
+        Every Role Group across all guilds with their roles.
+        """
+        groups: dict[int, Role_Group] = {group.id: group for group in await cls._fetch_models(SQL="""SELECT * FROM role_groups""")}
+        async with DB_Pool().connect() as conn:
+            _roles: list[Row] = await conn.fetchall("""SELECT * FROM role_group_roles""")
+        for row in _roles:
+            if row["group_id"] in groups:
+                groups[row["group_id"]].roles.add(row["role_id"])
+        return list(groups.values())
+
+    async def remove(self) -> None:
+        async with self.transaction():
+            await self._execute(SQL="""DELETE FROM role_group_roles WHERE group_id = ?""", parameters=(self.id,))
+            await self._execute(SQL="""DELETE FROM role_groups WHERE id = ?""", parameters=(self.id,))
+        self.roles.clear()
+
+    async def add_role(self, role_id: int) -> set[int]:
+        """
+        Adds a role to this group, a role can only be in one group so it is moved out of any other group.
+        """
+        await self._execute(SQL="""INSERT INTO role_group_roles(group_id, role_id) VALUES(?, ?)
+                            ON CONFLICT(role_id) DO UPDATE SET group_id = excluded.group_id""", parameters=(self.id, role_id))
+        self.roles.add(role_id)
+        return self.roles
+
+    async def remove_role(self, role_id: int) -> set[int]:
+        await self._execute(SQL="""DELETE FROM role_group_roles WHERE group_id = ? AND role_id = ?""", parameters=(self.id, role_id))
+        self.roles.discard(role_id)
+        return self.roles
+
+
+@dataclass(slots=True)
 class Settings(Base):
     guild_id: int
     mod_role_id: int = 0
@@ -86,10 +169,7 @@ class Settings(Base):
     infraction_log_channel_id: int = 0
     msg_timeout: int = 60
 
-    _pool: InitVar[DB_Pool| None] = None
-
-    def __post_init__(self, _pool: DB_Pool| None = None) -> None:
-        self._fields: list[str] = [field.name for field in fields(class_or_instance=self)]
+    _fields: ClassVar[tuple[str, ...]]  # Set once below the class.
 
     def __eq__(self, other: "Settings") -> bool:
         try:
@@ -115,20 +195,27 @@ class Settings(Base):
     async def add_or_get_settings(cls, guild_id: int) -> Self:
         if len(str(object=guild_id)) < 15:
             raise ValueError("Your `guild_id` value is to short. (<15)")
+        # A guild we already have is one read, no write lock.
         async with DB_Pool().connect() as conn:
-            # Check if the guild id is in the database.
+            res: Row | None = await conn.fetchone(f"""SELECT * FROM settings WHERE guild_id = ?""", (guild_id,))
+        if res is not None:
+            return cls(**res)
+
+        # One transaction, a new guild gets its `guilds` and `settings` rows together or not at all.
+        async with cls.transaction() as conn:
+            # Check if the guild id is in the database, another call may have added it since the read above.
             _exists: Row | None = await conn.fetchone(f"""SELECT * FROM guilds WHERE guild_id = ?""", (guild_id,))
           
             if _exists is None:
                 # It doesn't exist so we need to add it to two tables. guilds and settings.
                 await conn.execute(f"""INSERT INTO guilds(guild_id) VALUES(?)""", (guild_id,))
-                res: Row | None = await conn.fetchone(f"""INSERT INTO settings(guild_id) VALUES(?) RETURNING *""", (guild_id,))
+                res = await conn.fetchone(f"""INSERT INTO settings(guild_id) VALUES(?) RETURNING *""", (guild_id,))
                 if res is None:
                     cls._logger.error(msg=f"Failed to Add Settings from the Database. | Guild ID: {guild_id}")
                     return cls(guild_id=guild_id)
             else:
                 # It does exist so let's get all the guilds settings.
-                res: Row | None = await conn.fetchone(f"""SELECT * FROM settings WHERE guild_id = ?""", (guild_id))
+                res = await conn.fetchone(f"""SELECT * FROM settings WHERE guild_id = ?""", (guild_id,))
                 if res is None:
                     cls._logger.error(msg=f"Failed to Get Settings form the Database. | Guild ID: {guild_id}")
                     return cls(guild_id=guild_id)
@@ -223,3 +310,6 @@ class Settings(Base):
     #     await self._execute(SQL=f"""UPDATE settings SET infraction_log_channel_id = ? WHERE guild_id = ?""", parameters=(channel_id, self.guild_id))
     #     self.infraction_log_channel_id = channel_id
     #     return self
+
+
+Settings._fields = tuple(entry.name for entry in fields(Settings))
@@ -4,16 +4,17 @@ import functools
 from dataclasses import InitVar, dataclass, field, fields
 from datetime import datetime
 from sqlite3 import Cursor, Row
-from typing import Any, Literal, Self, Union
+from typing import Any, AsyncIterator, Literal, Self, Union
 
 import util.asqlite as asqlite
 
-from .base import Base, DB_Pool
+from .archive import get_archived, restore_archived_images
+from .base import Base, DB_Pool, lazy_timestamps
 
-__all__: tuple[str, ...] = ("User", "Leave", "Infraction", "Image",)
+__all__: tuple[str, ...] = ("User", "Leave", "Infraction", "Image", "VerifyChannel", "CleanupCheckpoint",)
 
 
-@dataclass
+@dataclass(slots=True)
 class Image:
     id: int
     user_id: int
@@ -31,14 +32,12 @@ class Image:
             return False
 
 
-@dataclass
+@lazy_timestamps("created_at")
+@dataclass(slots=True)
 class Leave:
     user_id: int
     created_at: datetime
 
-    def __post_init__(self) -> None:
-        self.created_at = datetime.fromtimestamp(timestamp=self.created_at)  # type: ignore
-
     def __hash__(self) -> int:
         return hash((self.user_id, self.created_at))
 
@@ -49,7 +48,8 @@ class Leave:
             return False
 
 
-@dataclass
+@lazy_timestamps("created_at")
+@dataclass(slots=True)
 class Infraction(Base):
     id: int  # Primary Key
     guild_id: int
@@ -57,10 +57,6 @@ class Infraction(Base):
     reason_msg_link: str
     created_at: datetime
 
-
-    def __post_init__(self) -> None:
-        self.created_at = datetime.fromtimestamp(timestamp=self.created_at)  # type: ignore
-
     def __hash__(self) -> int:
         return hash((self.user_id, self.reason_msg_link))
 
@@ -71,7 +67,123 @@ class Infraction(Base):
             return False
 
 
-@dataclass
+@dataclass(slots=True)
+class VerifyChannel(Base):
+    guild_id: int
+    member_id: int
+    channel_id: int
+
+    @classmethod
+    async def add_verify_channel(cls, guild_id: int, member_id: int, channel_id: int) -> Self | None:
+        async with DB_Pool().connect() as conn:
+            res: Row | None = await conn.fetchone(
+                """INSERT INTO verify_channels(guild_id, member_id, channel_id) VALUES(?, ?, ?)
+                ON CONFLICT(guild_id, member_id) DO UPDATE SET channel_id = excluded.channel_id RETURNING *""",
+                (guild_id, member_id, channel_id))
+            return cls(**res) if res is not None else None
+
+    @classmethod
+    async def get_verify_channels(cls) -> list[Self]:
+        return await cls._fetch_models(SQL="""SELECT * FROM verify_channels""")
+
+    @classmethod
+    async def remove_verify_channel(cls, channel_id: int) -> None:
+        async with DB_Pool().connect() as conn:
+            await conn.execute("""DELETE FROM verify_channels WHERE channel_id = ?""", (channel_id,))
+
+
+@lazy_timestamps("started_at", "updated_at")
+@dataclass(slots=True)
+class CleanupCheckpoint(Base):
+    """
+    How far the image cleanup of a Guild got, so a restart resumes after `last_image_id` instead of starting over.
+
+    Every `user_images` row with an id up to `last_image_id` has been handled by the current pass.
+    """
+    guild_id: int
+    last_image_id: int
+    deleted: int
+    failed: int  # Rows left in place this pass, they are retried on the next one.
+    started_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    async def get_or_start(cls, guild_id: int) -> Self:
+        """
+        Get's the Guild's checkpoint, or starts a new pass at the first image.
+        """
+        _now: float = datetime.now().timestamp()
+        async with DB_Pool().connect() as conn:
+            res: Row | None = await conn.fetchone(
+                """INSERT INTO cleanup_checkpoints(guild_id, started_at, updated_at) VALUES(?, ?, ?)
+                ON CONFLICT(guild_id) DO UPDATE SET guild_id = guild_id RETURNING *""",
+                (guild_id, _now, _now))
+            return cls(**res)  # type:ignore
+
+    async def pending_images(self, after_id: int, limit: int) -> list[Image]:
+        """
+        The next page of images belonging to banned or departed users that are not cleaned, in id order.
+        Current members' images are never returned.
+
+        Args:
+            after_id (int): Only images with a larger id.
+            limit (int): Page size.
+        """
+        return await self._fetch_models(
+            SQL="""SELECT user_images.* FROM user_images JOIN users ON users.user_id = user_images.user_id AND users.guild_id = user_images.guild_id
+            WHERE user_images.guild_id = ? AND users.cleaned = 0 AND (users.banned = 1 OR users.departed = 1) AND user_images.id > ?
+            ORDER BY user_images.id LIMIT ?""",
+            parameters=(self.guild_id, after_id, limit), model=Image)
+
+    async def count_pending(self) -> int:
+        res: Row | None = await self._fetchone(
+            SQL="""SELECT COUNT(*) FROM user_images JOIN users ON users.user_id = user_images.user_id AND users.guild_id = user_images.guild_id
+            WHERE user_images.guild_id = ? AND users.cleaned = 0 AND (users.banned = 1 OR users.departed = 1) AND user_images.id > ?""",
+            parameters=(self.guild_id, self.last_image_id))
+        return res[0] if res is not None else 0
+
+    async def commit(self, image_ids: list[int], last_image_id: int, deleted: int, failed: int) -> None:
+        """
+        Removes the handled `user_images` rows and moves the checkpoint forward in one transaction.
+
+        Args:
+            image_ids (list[int]): The rows to remove.
+            last_image_id (int): Every image up to this id has been handled.
+            deleted (int): Messages deleted since the last commit.
+            failed (int): Rows left in place since the last commit.
+        """
+        _now: float = datetime.now().timestamp()
+        async with self.transaction() as conn:
+            if len(image_ids) != 0:
+                await conn.execute(f"""DELETE FROM user_images WHERE id IN ({", ".join("?" * len(image_ids))})""", tuple(image_ids))
+            await conn.execute(
+                """UPDATE cleanup_checkpoints SET last_image_id = MAX(last_image_id, ?), deleted = deleted + ?, failed = failed + ?, updated_at = ?
+                WHERE guild_id = ?""",
+                (last_image_id, deleted, failed, _now, self.guild_id))
+        self.last_image_id = max(self.last_image_id, last_image_id)
+        self.deleted += deleted
+        self.failed += failed
+        self.updated_at = datetime.fromtimestamp(_now)
+
+    async def finish(self) -> int:
+        """
+        Ends the pass, marks the banned and departed users without any images left as cleaned and removes the checkpoint.
+
+        Returns:
+            int: How many users were marked cleaned.
+        """
+        async with self.transaction() as conn:
+            res: list[Row] = await conn.fetchall(
+                """UPDATE users SET cleaned = 1 WHERE guild_id = ? AND cleaned = 0 AND (banned = 1 OR departed = 1)
+                AND NOT EXISTS (SELECT 1 FROM user_images WHERE user_images.user_id = users.user_id AND user_images.guild_id = users.guild_id)
+                RETURNING user_id""",
+                (self.guild_id,))
+            await conn.execute("""DELETE FROM cleanup_checkpoints WHERE guild_id = ?""", (self.guild_id,))
+        return len(res)
+
+
+@lazy_timestamps("created_at", "last_active_at")
+@dataclass(slots=True)
 class User(Base):
     guild_id: int
     user_id: int
@@ -80,17 +192,18 @@ class User(Base):
     last_active_at: datetime
     banned: bool # DEFAULT - FALSE
     cleaned: bool # Default - FALSE
+    departed: bool # Default - FALSE, set when the member leaves and cleared when they rejoin.
     user_leaves: set[Leave] = field(default_factory=set)
     user_infractions: set[Infraction] = field(default_factory=set)
     user_images: set[Image] = field(default_factory=set)
 
 
     def __post_init__(self) -> None:
-        self.created_at = datetime.fromtimestamp(timestamp=self.created_at)  # type: ignore
-        self.last_active_at = datetime.fromtimestamp(timestamp=self.last_active_at)  # type: ignore
+        # `created_at` and `last_active_at` stay timestamps until read, see `lazy_timestamps`.
         self.verified = bool(self.verified)
         self.banned = bool(self.banned)
         self.cleaned = bool(self.cleaned)
+        self.departed = bool(self.departed)
     
     def __str__(self) -> str:
         _reply = ""
@@ -112,26 +225,44 @@ class User(Base):
 
     @classmethod
     async def add_or_get_user(cls, guild_id: int, user_id: int) -> Self | None:
+        # Most calls find the user, so the lookup takes no write lock. Only a new user opens a transaction,
+        # where the lookup is repeated so two events for the same new user can't both insert it.
         async with DB_Pool().connect() as conn:
             _exists: Row | None = await conn.fetchone(f"""SELECT * FROM users WHERE guild_id = ? AND user_id = ?""", (guild_id, user_id))
-            if _exists is None:
-                _time: float = datetime.now().timestamp()
-                res: Row | None = await conn.fetchone(
-                    """INSERT INTO users(guild_id, user_id, created_at, last_active_at) VALUES(?, ?, ?, ?) RETURNING *""",
-                    (guild_id, user_id, _time, _time))
-                return cls(**res) if res is not None else None
-            else:
-                # We only want to build out the user data IF they already exist.
-                _temp = cls(**_exists)
-                # cls._logger.info(msg=f"**DEBUG** - {_temp}")
-                return await _temp.build_user_data()
-                
+        if _exists is None:
+            async with cls.transaction() as conn:
+                _exists = await conn.fetchone(f"""SELECT * FROM users WHERE guild_id = ? AND user_id = ?""", (guild_id, user_id))
+                if _exists is None:
+                    _time: float = datetime.now().timestamp()
+                    res: Row | None = await conn.fetchone(
+                        """INSERT INTO users(guild_id, user_id, created_at, last_active_at) VALUES(?, ?, ?, ?) RETURNING *""",
+                        (guild_id, user_id, _time, _time))
+                    return cls(**res) if res is not None else None
+        # We only want to build out the user data IF they already exist.
+        _temp = cls(**_exists)
+        # cls._logger.info(msg=f"**DEBUG** - {_temp}")
+        return await _temp.build_user_data()
+
 
     @classmethod
-    async def get_banned_users(cls, guild_id: int) -> list[Self]:
+    async def remove_images_by_message(cls, channel_id: int, message_ids: list[int]) -> int:
+        """
+        Removes the `user_images` rows of deleted messages in one statement, whoever they belong to.
+
+        Returns:
+            int: How many rows were removed.
+        """
+        if len(message_ids) == 0:
+            return 0
         async with DB_Pool().connect() as conn:
-            res: list[Row] = await conn.fetchall(f"""SELECT * FROM users WHERE guild_id = ? AND banned = 1""", (guild_id,))
-            return [cls(**row) for row in res]
+            res: list[Row] = await conn.fetchall(
+                f"""DELETE FROM user_images WHERE channel_id = ? AND message_id IN ({", ".join("?" * len(message_ids))}) RETURNING id""",
+                (channel_id, *message_ids))
+        return len(res)
+
+    @classmethod
+    async def get_banned_users(cls, guild_id: int) -> list[Self]:
+        return await cls._fetch_models(SQL=f"""SELECT * FROM users WHERE guild_id = ? AND banned = 1""", parameters=(guild_id,))
 
     @classmethod
     async def get_unclean_users(cls, guild_id: int) -> list[Self]:
@@ -139,9 +270,38 @@ class User(Base):
         Get's a list of Database User classes that have not been cleaned. \n
         **AKA** - Images left in the Discord Server.
         """
+        return await cls._fetch_models(SQL=f"""SELECT * FROM users WHERE guild_id = ? AND cleaned = 0""", parameters=(guild_id,))
+
+    @classmethod
+    def iter_banned_users(cls, guild_id: int, chunk_size: int | None = None) -> AsyncIterator[Self]:
+        """
+        Streams the banned users instead of loading them all, see `Base._iter_rows`.
+        """
+        return cls._iter_models(SQL=f"""SELECT * FROM users WHERE guild_id = ? AND banned = 1""", parameters=(guild_id,), chunk_size=chunk_size)
+
+    @classmethod
+    def iter_unclean_users(cls, guild_id: int, chunk_size: int | None = None) -> AsyncIterator[Self]:
+        """
+        Streams the users that have not been cleaned, see `get_unclean_users`.
+        """
+        return cls._iter_models(SQL=f"""SELECT * FROM users WHERE guild_id = ? AND cleaned = 0""", parameters=(guild_id,), chunk_size=chunk_size)
+
+    @classmethod
+    async def get_inactive_user_ids(cls, guild_id: int, before: datetime, after_id: int = 0, limit: int | None = None) -> list[int]:
+        """
+        A page of the user IDs whose last activity is older than `before`, in ID order.
+
+        Unlike `_iter_rows` no connection is held between pages, for callers that do slow work per user (eg. kicking).
+
+        Args:
+            after_id (int): Only IDs larger than this, the last ID of the previous page.
+            limit (int | None): Page size, defaults to `CHUNK_SIZE`.
+        """
         async with DB_Pool().connect() as conn:
-            res: list[Row] = await conn.fetchall(f"""SELECT * FROM users WHERE guild_id = ? AND cleaned = 0""", (guild_id,))
-            return [cls(**row) for row in res]
+            res: list[Row] = await conn.fetchall(
+                f"""SELECT user_id FROM users WHERE guild_id = ? AND last_active_at < ? AND user_id > ? ORDER BY user_id LIMIT ?""",
+                (guild_id, before.timestamp(), after_id, limit or cls.CHUNK_SIZE))
+        return [row["user_id"] for row in res]
 
     async def build_user_data(self) -> Self:
         """
@@ -159,16 +319,25 @@ class User(Base):
         self.banned = banned
         return self.banned
 
+    @exists
+    async def update_departed(self, departed: bool) -> bool:
+        await self._fetchone(SQL=f"""UPDATE users SET departed = ? WHERE user_id = ? AND guild_id = ?""", parameters=(departed, self.user_id, self.guild_id))
+        self.departed = departed
+        return self.departed
+
     @exists
     async def update_verified(self, verified: bool) -> bool:
         await self._fetchone(SQL=f"""UPDATE users SET verified = ? WHERE user_id = ?""", parameters=(verified, self.user_id))
         self.verified = verified
         return self.verified
 
-    @exists
     async def update_last_active_at(self) -> datetime:
-        await self._fetchone(SQL=f"""UPDATE users SET last_active_at = ? WHERE user_id = ?""", parameters=(datetime.now().timestamp(), self.user_id))
-        self.last_active_at = datetime.now()
+        # Runs on every message, one autocommit UPDATE that checks the user exists through RETURNING instead of `@exists`.
+        _now: datetime = datetime.now()
+        res: Row | None = await self._fetchone(SQL=f"""UPDATE users SET last_active_at = ? WHERE user_id = ? RETURNING user_id""", parameters=(_now.timestamp(), self.user_id))
+        if res is None:
+            raise ValueError(f"The `user_id` of this class doesn't exist in the database table. ID: {self.user_id}")
+        self.last_active_at = _now
         return self.last_active_at
 
     @exists
@@ -181,13 +350,22 @@ class User(Base):
         return Leave(**res)
 
     @exists
-    async def get_leaves(self, before: datetime = datetime.now()) -> set[Leave]:
-        res: list[Row] = await self._fetchall(SQL=f"""SELECT * FROM user_leaves WHERE user_id = ? AND created_at <= ?""",
-                                              parameters=(self.user_id, before.timestamp()))
+    async def get_leaves(self, before: datetime | None = None, include_archived: bool = False) -> set[Leave]:
+        """
+        Get the Users leaves created at or before `before` (defaults to now).
+
+        Args:
+            include_archived (bool): Also read the leaves `run_archival` moved out of the table.
+        """
+        before = before or datetime.now()
+        res: list[Leave] = await self._fetch_models(SQL=f"""SELECT * FROM user_leaves WHERE user_id = ? AND created_at <= ?""",
+                                                    parameters=(self.user_id, before.timestamp()), model=Leave)
+        if include_archived:
+            res.extend(Leave(**row) for row in await get_archived(table="user_leaves", user_id=self.user_id, before=before))
         if len(res) == 0:
             return set()
-        self.user_leaves = set([Leave(**row) for row in res])
-        return set([Leave(**row) for row in res])
+        self.user_leaves = set(res)
+        return set(self.user_leaves)
 
     @exists
     async def add_infraction(self, reason_msg_link: str) -> Infraction | None:
@@ -200,15 +378,24 @@ class User(Base):
         return Infraction(**res)
 
     @exists
-    async def get_infractions(self, before: datetime = datetime.now()) -> set[Infraction]:
-        res: list[Row] = await self._fetchall(
+    async def get_infractions(self, before: datetime | None = None, include_archived: bool = False) -> set[Infraction]:
+        """
+        Get the Users infractions created at or before `before` (defaults to now).
+
+        Args:
+            include_archived (bool): Also read the infractions `run_archival` moved out of the table.
+        """
+        before = before or datetime.now()
+        res: list[Infraction] = await self._fetch_models(
             SQL="""SELECT * FROM infractions WHERE guild_id = ? AND user_id = ? AND created_at <= ?""",
-            parameters=(self.guild_id, self.user_id, before.timestamp()),
+            parameters=(self.guild_id, self.user_id, before.timestamp()), model=Infraction,
         )
+        if include_archived:
+            res.extend(Infraction(**row) for row in await get_archived(table="infractions", user_id=self.user_id, before=before, guild_id=self.guild_id))
         if len(res) == 0:
             return set()
-        self.user_infractions = set([Infraction(**row) for row in res])
-        return set([Infraction(**row) for row in res])
+        self.user_infractions = set(res)
+        return set(self.user_infractions)
 
     @exists
     async def remove_infraction(self, infraction: Infraction | None = None, id: int | None = None) -> set[Infraction]:
@@ -244,12 +431,12 @@ class User(Base):
 
     @exists
     async def get_all_images(self) -> set[Image]:
-        res: list[Row] = await self._fetchall(SQL=f"""SELECT * FROM user_images WHERE user_id = ? AND guild_id = ?""",
-                                              parameters=(self.user_id, self.guild_id))
+        res: list[Image] = await self._fetch_models(SQL=f"""SELECT * FROM user_images WHERE user_id = ? AND guild_id = ?""",
+                                                    parameters=(self.user_id, self.guild_id), model=Image)
         if len(res) == 0:
             return set()
-        self.user_images = set([Image(**row) for row in res])
-        return set([Image(**row) for row in res])
+        self.user_images = set(res)
+        return set(self.user_images)
 
     @exists
     async def remove_image(self, image: Image) -> set[Image]:
@@ -262,6 +449,20 @@ class User(Base):
         """
         Update the Database Users cleaned status.
         """
-        await self._fetchone(SQL=f"""UPDATE users SET cleaned = ? WHERE user_id = ?""", parameters=(cleaned, self.user_id))
+        await self._fetchone(SQL=f"""UPDATE users SET cleaned = ? WHERE user_id = ? AND guild_id = ?""", parameters=(cleaned, self.user_id, self.guild_id))
         self.cleaned = cleaned
         return self.cleaned
+
+    async def restore_images(self) -> int:
+        """
+        Marks the User as not cleaned and moves their archived images back into `user_images`, so the cleanup deletes them too.
+        Only for a User that left or was banned, a member's images are left archived.
+
+        This reads the archive files, so don't call it inside a `Base.transaction()`.
+
+        Returns:
+            int: Images restored.
+        """
+        # Not cleaned first, `run_archival` only archives cleaned users' images and can't move these back out mid restore.
+        await self.update_cleaned(cleaned=False)
+        return await restore_archived_images(user_id=self.user_id, guild_id=self.guild_id)
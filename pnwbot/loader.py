@@ -1,12 +1,16 @@
+import ast
+import asyncio
+import importlib
 import logging
 import os
 import pathlib
 import sys
+import time
 import traceback
 from typing import TYPE_CHECKING
 
 from discord.ext import commands
-from util.utils import reload_module_dependencies
+from util.reloader import ModuleReloader, ReloadReport
 
 if TYPE_CHECKING:
     from main import MrFriendly
@@ -23,46 +27,155 @@ class Handler():
         self._logger: logging.Logger = logging.getLogger()
         sys.path.append(self._cog_path.as_posix())
         self._loaded_cogs: list[str] = []
+        self._load_times: dict[str, float] = {}  # Cog -> seconds spent in `load_extension`/`reload_extension`
+        self._reloader: ModuleReloader = ModuleReloader(root=self._cog_path)
 
-    async def cog_auto_loader(self, reload: bool = False) -> None:
-        """This will load all Cogs inside of the cogs folder."""
+    @staticmethod
+    def _prefetch_imports(script: pathlib.Path) -> list[str]:
+        """
+        Imports the top level dependencies of a cog file, leaving the cog module itself to `load_extension`.
+
+        Returns:
+            list[str]: The module names that imported.
+        """
+        tree: ast.Module = ast.parse(source=script.read_text(encoding="utf-8"))
+        names: list[str] = []
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                names.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module is not None:
+                names.append(node.module)
+
+        imported: list[str] = []
+        for name in names:
+            # `main` is running as `__main__`, importing it again would build a second bot.
+            if name == "main" or name.startswith("cogs"):
+                continue
+            try:
+                importlib.import_module(name)
+                imported.append(name)
+            except Exception as e:
+                # `load_extension` will raise the real error for this cog.
+                logging.getLogger().debug(msg=f"Prefetching `{name}` for {script.name} failed. | Error: {e!r}")
+                continue
+        return imported
+
+    async def cog_auto_loader(self, reload: bool = False) -> dict[str, Exception]:
+        """
+        This will load all Cogs inside of the cogs folder.
+
+        A cog failing to load is logged and returned, it no longer stops the remaining cogs from loading.
+
+        Returns:
+            dict[str, Exception]: The cogs that failed to load and why.
+        """
         # path = f'cogs'  # This gets us to the folder for the module specific scripts to load via the cog.
         path = "cogs"
-        # Grab all the cogs inside my `cogs` folder and duplicate the list.
-        cog_file_list = pathlib.Path.joinpath(self._cog_path, "cogs").iterdir()
-        cur_cog_file_list = list(cog_file_list)
-
-        # This while loop will force it to load EVERY cog it finds until the list is empty.
-        while len(cur_cog_file_list) > 0:
-            for script in cur_cog_file_list:
-                # Ignore Py-cache or similar files.
-                # Lets Ignore our Custom Permissions Cog. We will load it on-demand.
-                if script.name.startswith('__') or script.name.startswith('_') or not script.name.endswith('.py'):
-                    cur_cog_file_list.remove(script)
-                    continue
-
-                cog: str = f'{path}.{script.name[:-3]}'
-                try:
-                    if reload and cog in self._loaded_cogs:
-                        self._logger.info(msg="Attempting to reload all cogs.")
-                        await self._bot.reload_extension(name=cog)
-                        cur_cog_file_list.remove(script)
-
-                    else:
-                        await self._bot.load_extension(name=cog)
-                        # Append to our loaded cogs for dependency check
-                        self._loaded_cogs.append(cog)
-                        # Remove the entry from our cog list; so we don't attempt to load it again.
-                        cur_cog_file_list.remove(script)
-
-                    self._logger.info(msg=f'**FINISHED LOADING** {self._name} -> **{cog}**')
-
-                except commands.errors.ExtensionAlreadyLoaded:
-                    cur_cog_file_list.remove(script)
-                    self._logger.error(msg=f'**ERROR** Loading Cog ** - {cog} ExtensionAlreadyLoaded {traceback.format_exc()}')
-                    continue
-
-                except FileNotFoundError as e:
-                    self._logger.error(msg=f'**ERROR** Loading Cog ** - {cog} File Not Found {traceback.format_exc()}')
-
-        self._logger.info(msg=f'**All Cog Modules Loaded**')
+        # Ignore Py-cache or similar files.
+        # Lets Ignore our Custom Permissions Cog. We will load it on-demand.
+        scripts: list[pathlib.Path] = [script for script in pathlib.Path.joinpath(self._cog_path, "cogs").iterdir()
+                                       if not script.name.startswith('_') and script.name.endswith('.py')]
+
+        if reload is False:
+            # The import system locks per module, so the cogs' dependencies can be imported from worker threads at once.
+            # This leaves `load_extension` with only the cog module itself to execute.
+            async with self._bot._startup.phase(name="cog_imports"):
+                await asyncio.gather(*(asyncio.to_thread(self._prefetch_imports, script) for script in scripts))
+
+        cogs: list[str] = [f'{path}.{script.name[:-3]}' for script in scripts]
+        async with self._bot._startup.phase(name="cog_load" if reload is False else "cog_reload"):
+            results: list[Exception | None] = await asyncio.gather(*(self._load_cog(cog=cog, reload=reload) for cog in cogs))
+        failed: dict[str, Exception] = {cog: error for cog, error in zip(cogs, results) if error is not None}
+
+        self._log_load_report()
+        # Whatever is loaded now is the baseline `hot_reload` compares against.
+        self._reloader.snapshot()
+        self._logger.info(msg=f'**All Cog Modules Loaded**' if len(failed) == 0 else f'**Cog Modules Loaded** - {len(failed)} failed: {", ".join(failed)}')
+        return failed
+
+    async def _load_cog(self, cog: str, reload: bool = False) -> Exception | None:
+        """
+        Loads or reloads a single cog and records how long it took.
+
+        Returns:
+            Exception | None: The error if the cog failed to load.
+        """
+        _start: float = time.perf_counter()
+        try:
+            if reload and cog in self._loaded_cogs:
+                self._logger.info(msg=f"Attempting to reload {cog}.")
+                await self._bot.reload_extension(name=cog)
+            else:
+                await self._bot.load_extension(name=cog)
+                # Append to our loaded cogs for dependency check
+                self._loaded_cogs.append(cog)
+
+        except commands.errors.ExtensionAlreadyLoaded as e:
+            self._logger.error(msg=f'**ERROR** Loading Cog ** - {cog} ExtensionAlreadyLoaded {traceback.format_exc()}')
+            return e
+
+        except FileNotFoundError as e:
+            self._logger.error(msg=f'**ERROR** Loading Cog ** - {cog} File Not Found {traceback.format_exc()}')
+            return e
+
+        except Exception as e:
+            self._logger.error(msg=f'**ERROR** Loading Cog ** - {cog} {traceback.format_exc()}')
+            return e
+
+        self._load_times[cog] = time.perf_counter() - _start
+        self._logger.info(msg=f'**FINISHED LOADING** {self._name} -> **{cog}**')
+        return None
+
+    async def hot_reload(self) -> ReloadReport:
+        """
+        Reloads only the modules whose source changed since the last (re)load and the modules depending on them,
+        dependencies first. Cogs are reloaded through `reload_extension`, everything else with `importlib.reload`.
+
+        Returns:
+            ReloadReport: What changed, what was reloaded and how long it took.
+        """
+        _start: float = time.perf_counter()
+        report: ReloadReport = ReloadReport()
+        report.changed, order = self._reloader.plan()
+        for name in order:
+            _module_start: float = time.perf_counter()
+            try:
+                if name in self._bot.extensions:
+                    await self._bot.reload_extension(name=name)
+                else:
+                    importlib.reload(sys.modules[name])
+            except Exception as e:
+                self._logger.error(msg=f'**ERROR** Reloading Module ** - {name} {traceback.format_exc()}')
+                report.failed[name] = e
+                continue
+            report.reloaded[name] = time.perf_counter() - _module_start
+            if name in self._loaded_cogs:
+                self._load_times[name] = report.reloaded[name]
+
+        # Pick up cog files added since the last load.
+        for script in pathlib.Path.joinpath(self._cog_path, "cogs").iterdir():
+            cog: str = f"cogs.{script.name[:-3]}"
+            if script.name.startswith('_') or not script.name.endswith('.py') or cog in self._loaded_cogs:
+                continue
+            report.changed.append(cog)
+            _module_start = time.perf_counter()
+            error: Exception | None = await self._load_cog(cog=cog)
+            if error is not None:
+                report.failed[cog] = error
+            else:
+                report.reloaded[cog] = time.perf_counter() - _module_start
+
+        # Modules that failed keep their new fingerprint, fixing the file changes it again.
+        self._reloader.snapshot()
+        report.seconds = time.perf_counter() - _start
+        self._logger.info(msg=f'**Hot Reload** - {report}')
+        return report
+
+    def _log_load_report(self) -> None:
+        """
+        Logs how long each cog took to load, slowest first.
+        """
+        if len(self._load_times) == 0:
+            return
+        _report: str = "\n".join(f"> {cog}: {seconds * 1000:.1f}ms" for cog, seconds in sorted(self._load_times.items(), key=lambda entry: entry[1], reverse=True))
+        self._logger.info(msg=f'**Cog Load Times** - Total: {sum(self._load_times.values()) * 1000:.1f}ms\n{_report}')
@@ -3,7 +3,7 @@ import asyncio
 import configparser
 import contextlib
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta, timezone
 from logging import Logger
 from pathlib import Path
 from sqlite3 import Row
@@ -12,16 +12,28 @@ from typing import Any, Union
 
 import discord
 import logger
+from cogs.love_cog_utils.db import DB_FILENAME as LOVERS_DB_FILENAME
 from database import *
+from database.archive import ArchiveReport, ages_from_config, run_archival
+from database.backup import BackupReport, backup_database
+from database.ingest import ImageIngestQueue
+from database.maintenance import MaintenanceReport, run_maintenance
 from database.settings import Settings
 from database.user import Image, User
-from discord import CategoryChannel, Forbidden, Intents, Message, TextChannel
+from discord import CategoryChannel, Forbidden, Message, TextChannel
 from discord.ext import commands, tasks
 from loader import *
+from util.cache_profile import CacheProfile
+from util.cleanup import CleanupPipeline, CleanupReport
 from util.commandtree import MrFriendlyCommandTree
 from util.emoji_lib import Emojis
+from util.startup import StartupTracer
 
 TOKEN: str
+# Low traffic for the server, 3:30 AM Pacific (standard time).
+ARCHIVE_TIME: time = time(hour=11, tzinfo=timezone.utc)
+MAINTENANCE_TIME: time = time(hour=11, minute=30, tzinfo=timezone.utc)
+BACKUP_TIME: time = time(hour=12, tzinfo=timezone.utc)
 
 
 def load_ini() -> Any:
@@ -34,6 +46,24 @@ def load_ini() -> Any:
     else:
         raise ValueError("Failed to find `DISCORD` section in token.ini file.")
 
+def load_cache_profile() -> CacheProfile:
+    """
+    Get's the `[CACHE]` section of token.ini, see `CacheProfile`.
+    """
+    path: str = Path("./pnwbot/token.ini").as_posix()
+    _parser = configparser.ConfigParser()
+    _parser.read(filenames=path)
+    return CacheProfile.from_config(section=_parser["CACHE"] if "CACHE" in _parser.sections() else None)
+
+def load_archive_ages() -> dict[str, timedelta]:
+    """
+    Get's the `[ARCHIVE]` section of token.ini, see `database.archive.ages_from_config`.
+    """
+    path: str = Path("./pnwbot/token.ini").as_posix()
+    _parser = configparser.ConfigParser()
+    _parser.read(filenames=path)
+    return ages_from_config(section=_parser["ARCHIVE"] if "ARCHIVE" in _parser.sections() else None)
+
 async def _get_prefix(bot: "MrFriendly", message: Message) -> list[str]:
     """
     Get's the Database Guild Prefixes
@@ -66,36 +96,73 @@ class MrFriendly(commands.Bot):
     _bot_name: str = __qualname__
     _emojis = Emojis
     _settings: Settings # Guild database settings
+    _startup: StartupTracer # Startup phase timings and deferred work
+    _image_queue: ImageIngestQueue # Batches `user_images` inserts off the `on_message` path
+    _cache_profile: CacheProfile # Gateway intents and cache sizes
+    _maintenance_reports: dict[str, MaintenanceReport] # Database file -> last maintenance report
+    _backup_reports: dict[str, BackupReport] # Database file -> last backup report
+    _archive_ages: dict[str, timedelta] # Table -> how old rows get before they are archived
+    _archive_report: ArchiveReport | None # The last archival run
 
     def __init__(self) -> None:
-        intents: Intents = Intents.default()
-        intents.members = True
-        intents.message_content = True
-        intents.presences = True
+        self._cache_profile = load_cache_profile()
+        self._archive_ages = load_archive_ages()
         self._prefix = "$"
         self.owner_id = None
         # Perms Int - 19096431750358
         self.nsfw_category: CategoryChannel | None = None  # NSFW Pics Discord Category ID
         self._guild_id: int = 1259645744420360243  # PNW Adult Friends
         self._to_clean_channels: set[TextChannel] = set()
-
-        super().__init__(intents=intents,
+        self._startup = StartupTracer()
+        self._image_queue = ImageIngestQueue()
+        self._maintenance_reports = {}
+        self._backup_reports = {}
+        self._archive_report = None
+        self._maintenance_lock: asyncio.Lock = asyncio.Lock()
+
+        self._logger.info(msg=f"Using the `{self._cache_profile.name}` cache profile. | {self._cache_profile}")
+        super().__init__(**self._cache_profile.client_kwargs(),
                          command_prefix=_get_prefix,
                          tree_cls=MrFriendlyCommandTree,
                          strip_after_prefix=True)
 
+    async def on_connect(self) -> None:
+        self._startup.mark(name="gateway_connect")
+
     async def on_ready(self) -> None:
         self._logger.info(msg=f'Logged on as {self._bot_name}!')
+        self._startup.mark(name="ready")
+        if "member_chunking" not in self._startup.phases and "gateway_connect" in self._startup.marks:
+            # The READY payload and chunking every guild's members happen between connecting and `on_ready`.
+            self._startup.phases["member_chunking"] = self._startup.marks["ready"] - self._startup.marks["gateway_connect"]
+        await self._startup.run_deferred()
 
-    async def setup_hook(self) -> None:
-        await self._database._create_tables()
-        self._client_task: asyncio.Task = asyncio.create_task(coro=self.setup_attributes())
+    async def _start_loops(self) -> None:
         self.delete_pictures.start()
         self.kick_unverified_users.start()
+        self.user_cleanup.start()
+        self.database_archival.start()
+        self.database_maintenance.start()
+        self.database_backup.start()
         # self.kick_inactive_users.start() #! Disabling Until the server is popular. 8/25/2024
+
+    async def setup_hook(self) -> None:
+        """
+        Only the critical startup work runs here, everything else is deferred until after READY through `self._startup.defer()`.
+        """
+        async with self._startup.phase(name="db_init"):
+            await self._database._create_tables()
+        self._image_queue.start()
+        self._client_task: asyncio.Task = asyncio.create_task(coro=self.setup_attributes())
+        self._startup.defer(name="loops", func=self._start_loops)
         self._handler = Handler(bot=self)
         await self._handler.cog_auto_loader()
 
+    async def close(self) -> None:
+        # Insert the queued image rows before the connection to the database goes away.
+        await self._image_queue.drain()
+        await super().close()
+
     @tasks.loop(minutes=5, reconnect=True)
     async def delete_pictures(self) -> None:
         """
@@ -128,6 +195,79 @@ class MrFriendly(commands.Bot):
             except Exception as ex:
                 self._logger.error(msg=f"Failed to delete message. | Message ID: {message.id} | Exception: {ex}")  # print the exception to the local log while allowing us to continue delete attempts
 
+    @staticmethod
+    def _database_files() -> tuple[Path, ...]:
+        # The lovers database is opened relative to the CWD, see `cogs.love_cog_utils.db`.
+        return (Path(DB_Pool.DB_FILE_PATH), Path(LOVERS_DB_FILENAME))
+
+    @tasks.loop(time=ARCHIVE_TIME, reconnect=True)
+    async def database_archival(self) -> None:
+        """
+        Moves old rows into the archive once a day at `ARCHIVE_TIME`, before the maintenance gives their pages back.
+        """
+        await self.run_database_archival()
+
+    async def run_database_archival(self, time_budget: float = 300.0) -> ArchiveReport:
+        """
+        Runs `run_archival` with the ages from the `[ARCHIVE]` section of token.ini.
+
+        Returns:
+            ArchiveReport: Also kept in `_archive_report`.
+        """
+        async with self._maintenance_lock:
+            report: ArchiveReport = await run_archival(ages=self._archive_ages, time_budget=time_budget)
+        self._archive_report = report
+        self._logger.info(msg=f"**Database Archival**\n{report}")
+        return report
+
+    @tasks.loop(time=MAINTENANCE_TIME, reconnect=True)
+    async def database_maintenance(self) -> None:
+        """
+        Runs the SQLite maintenance once a day at `MAINTENANCE_TIME`.
+        """
+        await self.run_database_maintenance()
+
+    async def run_database_maintenance(self, time_budget: float = 120.0) -> list[MaintenanceReport]:
+        """
+        Runs `run_maintenance` on our database and the lovers database, sharing `time_budget` seconds between them.
+
+        Returns:
+            list[MaintenanceReport]: A report per database, also kept in `_maintenance_reports`.
+        """
+        reports: list[MaintenanceReport] = []
+        async with self._maintenance_lock:
+            _deadline: float = asyncio.get_running_loop().time() + time_budget
+            for path in self._database_files():
+                _remaining: float = max(_deadline - asyncio.get_running_loop().time(), 0)
+                report: MaintenanceReport = await run_maintenance(path=path, time_budget=_remaining)
+                self._maintenance_reports[path.name] = report
+                reports.append(report)
+                self._logger.info(msg=f"**Database Maintenance** - {path.name}\n{report}")
+        return reports
+
+    @tasks.loop(time=BACKUP_TIME, reconnect=True)
+    async def database_backup(self) -> None:
+        """
+        Backs up our databases once a day at `BACKUP_TIME`.
+        """
+        await self.run_database_backup()
+
+    async def run_database_backup(self) -> list[BackupReport]:
+        """
+        Snapshots each database with `backup_database`, never at the same time as the maintenance.
+
+        Returns:
+            list[BackupReport]: A report per database, also kept in `_backup_reports`.
+        """
+        reports: list[BackupReport] = []
+        async with self._maintenance_lock:
+            for path in self._database_files():
+                report: BackupReport = await backup_database(source=path)
+                self._backup_reports[path.name] = report
+                reports.append(report)
+                self._logger.info(msg=f"**Database Backup** - {path.name}\n{report}")
+        return reports
+
     @tasks.loop(hours=6, reconnect=True)
     async def kick_unverified_users(self) -> None:
         """
@@ -187,14 +327,15 @@ class MrFriendly(commands.Bot):
             if _bot is not None and _bot.guild_permissions.kick_members is False:
                 self._logger.error(msg=f"{self.user.name} does not have permission to kick members in the Discord Guild. | Guild ID: {self._guild_id}")
 
-        for member in _guild.members:
-            if member.bot is True:
-                continue
-            _user: User | None = await User.add_or_get_user(guild_id=member.guild.id, user_id=member.id)
-            _active_by: datetime = (datetime.now() - self._inactive_time)
-            if _user is None:
-                continue
-            if _user.last_active_at < _active_by:
+        # Only users past our inactive time come back from the database, members without a row have never been inactive long enough.
+        _active_by: datetime = (datetime.now() - self._inactive_time)
+        # One page of IDs at a time, the connection goes back to the pool before the (slow, rate limited) kicks.
+        _user_ids: list[int] = await User.get_inactive_user_ids(guild_id=_guild.id, before=_active_by)
+        while len(_user_ids) != 0:
+            for user_id in _user_ids:
+                member: discord.Member | None = _guild.get_member(user_id)
+                if member is None or member.bot is True:
+                    continue
                 try:
                     await member.kick(reason="Inactive for over 6 months.")
                     self._logger.info(msg=f"Kicked {member} for being inactive for 6 months. | Guild ID: {self._guild_id}")
@@ -204,6 +345,7 @@ class MrFriendly(commands.Bot):
                     self._logger.error(msg=f"Unable to kick {member} due to {e}")
                 # delay between kicks
                 await asyncio.sleep(delay=1)
+            _user_ids = await User.get_inactive_user_ids(guild_id=_guild.id, before=_active_by, after_id=_user_ids[-1])
 
     @tasks.loop(minutes=15)
     async def user_cleanup(self) -> None:
@@ -216,29 +358,10 @@ class MrFriendly(commands.Bot):
                 if _user is not None and _user.guild_permissions.manage_messages is False:
                     self._logger.error(msg=f"{self.user.name} does not have permission to manage messages in the Discord Guild. | Guild ID: {guild.id}")
 
-            _users: list[User] = await User.get_banned_users(guild_id=guild.id)
-            _users.extend(await User.get_unclean_users(guild_id=guild.id))
-
-            for user in _users:
-                if user.cleaned is True:
-                    continue
-
-                _images: list[Image] = list(await user.get_all_images())
-                if len(_images) == 0:
-                    await user.update_cleaned(cleaned=True)
-                    continue
-                for image in _images[:30]:
-                    _channel = guild.get_channel(image.channel_id)
-                    if isinstance(_channel, TextChannel):
-                        try:
-                            await _channel.get_partial_message(image.message_id).delete()
-                        except Forbidden:
-                            self._logger.error(msg=f"Unable to delete the message {image.message_id} in {_channel} - Permission Forbidden | Guild ID: {guild.id}")
-                        except Exception as e:
-                            self._logger.error(msg=f"Unable to delete the message {image.message_id} in {_channel} | Guild ID: {guild.id} | Error : {e}")
-                        await user.remove_image(image=image)
-                    else:
-                        await user.remove_image(image=image)
+            # Resumes from the Guild's checkpoint and stops at the pipeline's time budget, see `CleanupPipeline`.
+            report: CleanupReport = await CleanupPipeline(guild=guild).run()
+            if report.handled != 0 or report.finished is False:
+                self._logger.info(msg=f"User cleanup | Guild ID: {guild.id} | {report}")
 
     async def on_command(self, context: commands.Context) -> None:
         """
@@ -358,7 +481,8 @@ class MrFriendly(commands.Bot):
             
             if len(message.attachments) != 0 and _user is not None:
                 # We update the DB with the Discord Message Attachment/Image information for when the user leaves to keep privacy.
-                await _user.add_image(channel_id=message.channel.id, message_id=message.id)
+                # Queued and inserted in batches, see `ImageIngestQueue`.
+                self._image_queue.enqueue(user_id=_user.user_id, guild_id=message.guild.id, channel_id=message.channel.id, message_id=message.id)
 
             del _user
             # ignore moderator messages, but handle commands.
@@ -393,24 +517,32 @@ class MrFriendly(commands.Bot):
                             await message.channel.send(f"{message.author.mention}: Only Images and Videos are allowed in this channel", delete_after=10)
                             return
 
-    async def on_message_delete(self, message: discord.Message) -> None:
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
         """
-        Called when a message is deleted. If the message is not found in the internal message cache, then this event will not be called. Messages might not be in cache if the message is too old or the client is participating in high traffic guilds.
-
-        If this occurs increase the max_messages parameter or use the `on_raw_message_delete()` event instead.
+        Called when a message is deleted. Unlike `on_message_delete()`, this is called regardless of the message being in the internal message cache or not.
 
         This requires `Intents.messages` to be enabled.
         """
-        if message.guild is None:
-            return
-        _user: User | None = await User.add_or_get_user(guild_id=message.guild.id, user_id=message.author.id)
-        if _user is None:
+        if payload.guild_id is None:
             return
+        await self._remove_deleted_images(channel_id=payload.channel_id, message_ids=[payload.message_id])
 
-        _img: Image | None = await _user.get_image(channel_id=message.channel.id, message_id=message.id)
-        if _img is None:
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent) -> None:
+        """
+        Called when a bulk delete is triggered. Unlike `on_bulk_message_delete()`, this is called regardless of the messages being in the internal message cache or not.
+
+        This requires `Intents.messages` to be enabled.
+        """
+        if payload.guild_id is None:
             return
-        await _user.remove_image(image=_img)
+        await self._remove_deleted_images(channel_id=payload.channel_id, message_ids=list(payload.message_ids))
+
+    async def _remove_deleted_images(self, channel_id: int, message_ids: list[int]) -> None:
+        """
+        Removes the `user_images` rows of deleted messages with a single statement, including rows still waiting in the ingest queue.
+        """
+        self._image_queue.discard(channel_id=channel_id, message_ids=message_ids)
+        await User.remove_images_by_message(channel_id=channel_id, message_ids=message_ids)
 
     async def on_member_remove(self, member: discord.Member) -> None:
         """
@@ -428,7 +560,8 @@ class MrFriendly(commands.Bot):
         _user: User | None = await User.add_or_get_user(guild_id=member.guild.id, user_id=member.id)
         if _user is None:
             return
-        await _user.update_cleaned(cleaned=False)
+        await _user.update_departed(departed=True)
+        await _user.restore_images()
         res: Leave | None = await _user.add_leave()
         # self._logger.info(msg=f"**DEBUG** - {_user.user_leaves} {res}")
         self._logger.info(msg=f"{member} has left the server. | Member Leave Count: {len(_user.user_leaves)} Guild ID: {member.guild.id}")
@@ -449,6 +582,8 @@ class MrFriendly(commands.Bot):
         _user: User | None = await User.add_or_get_user(guild_id=member.guild.id, user_id=member.id)
         if _user is None:
             return
+        # Back in the Guild, the user cleanup leaves their images alone again.
+        await _user.update_departed(departed=False)
         await _user.update_cleaned(cleaned=False)
 
     async def on_member_ban(self, guild: discord.Guild, user: discord.User) -> None:
@@ -472,6 +607,7 @@ class MrFriendly(commands.Bot):
             return
 
         await _user.update_banned(banned=True)
+        await _user.restore_images()
    
     async def setup_attributes(self) -> None:
         """
@@ -0,0 +1,81 @@
+import logging
+from dataclasses import dataclass, replace
+from typing import Any, Literal, Mapping
+
+from discord import Intents, MemberCacheFlags
+
+__all__: tuple[str, ...] = ("CacheProfile", "CACHE_PROFILES")
+
+
+@dataclass(frozen=True)
+class CacheProfile():
+    """
+    What the bot asks the gateway for and keeps in memory.
+
+    Pick one with `profile = <name>` under `[CACHE]` in `token.ini`, `max_messages` and `chunk_guilds_at_startup` can be overridden there as well.
+    """
+    name: str
+    presences: bool
+    members: bool
+    message_content: bool
+    member_cache: Literal["all", "joined", "none"]
+    chunk_guilds_at_startup: bool
+    max_messages: int | None
+
+    def intents(self) -> Intents:
+        intents: Intents = Intents.default()
+        intents.members = self.members
+        intents.message_content = self.message_content
+        intents.presences = self.presences
+        return intents
+
+    def member_cache_flags(self) -> MemberCacheFlags:
+        if self.member_cache == "all":
+            return MemberCacheFlags.from_intents(self.intents())
+        if self.member_cache == "joined":
+            return MemberCacheFlags(joined=True, voice=False)
+        return MemberCacheFlags.none()
+
+    def client_kwargs(self) -> dict[str, Any]:
+        """
+        The keyword arguments for `commands.Bot.__init__`.
+        """
+        return {"intents": self.intents(),
+                "member_cache_flags": self.member_cache_flags(),
+                "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+                "max_messages": self.max_messages}
+
+    @classmethod
+    def from_config(cls, section: Mapping[str, str] | None) -> "CacheProfile":
+        """
+        Builds the profile from the `[CACHE]` section of our config, falls back to `default` if there is none.
+        """
+        if section is None:
+            return CACHE_PROFILES["default"]
+        _name: str = section.get("profile", "default").strip().lower()
+        profile: CacheProfile | None = CACHE_PROFILES.get(_name)
+        if profile is None:
+            logging.getLogger().warning(msg=f"Unknown cache profile `{_name}`, using `default`. | Profiles: {', '.join(CACHE_PROFILES)}")
+            profile = CACHE_PROFILES["default"]
+
+        if "max_messages" in section:
+            try:
+                _max: int = int(section["max_messages"])
+            except ValueError:
+                logging.getLogger().warning(msg=f"Cache `max_messages` is not a number, keeping the `{profile.name}` default. | Value: {section['max_messages']}")
+            else:
+                profile = replace(profile, max_messages=_max if _max > 0 else None)
+        if "chunk_guilds_at_startup" in section:
+            profile = replace(profile, chunk_guilds_at_startup=section["chunk_guilds_at_startup"].strip().lower() in ("1", "true", "yes", "on"))
+        return profile
+
+
+CACHE_PROFILES: dict[str, CacheProfile] = {
+    # What the bot always ran with, presences included.
+    "full": CacheProfile(name="full", presences=True, members=True, message_content=True, member_cache="all", chunk_guilds_at_startup=True, max_messages=1000),
+    # Nothing reads presence data, dropping it is the biggest saving that keeps every feature working.
+    "default": CacheProfile(name="default", presences=False, members=True, message_content=True, member_cache="all", chunk_guilds_at_startup=True, max_messages=1000),
+    # No member chunking, only members seen through events are cached.
+    # The kick loops and member search only see those members, so this is for small memory budgets.
+    "lean": CacheProfile(name="lean", presences=False, members=True, message_content=True, member_cache="joined", chunk_guilds_at_startup=False, max_messages=100),
+}
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Literal
+
+import discord
+from database.user import CleanupCheckpoint, Image
+
+__all__: tuple[str, ...] = ("CleanupPipeline", "CleanupReport")
+
+Outcome = Literal["deleted", "missing", "forbidden", "failed"]
+
+
+@dataclass
+class CleanupReport():
+    guild_id: int
+    deleted: int = 0
+    missing: int = 0  # The message or channel was already gone.
+    forbidden: int = 0  # We can't delete it, the row is removed like any other.
+    failed: int = 0  # Left in place, retried on the next pass.
+    users_cleaned: int = 0
+    remaining: int = 0
+    finished: bool = False  # The pass reached the last image, otherwise it resumes from the checkpoint.
+    seconds: float = 0
+
+    @property
+    def handled(self) -> int:
+        return self.deleted + self.missing + self.forbidden + self.failed
+
+    def __str__(self) -> str:
+        _rate: float = self.handled / self.seconds if self.seconds > 0 else 0
+        _eta: str = f" ETA: {self.remaining / _rate / 60:.1f}m" if _rate > 0 and self.finished is False else ""
+        return (f"{'Finished' if self.finished else 'Paused'} in {self.seconds:.1f}s ({_rate:.2f}/s) | "
+                f"Deleted: {self.deleted} Missing: {self.missing} Forbidden: {self.forbidden} Failed: {self.failed} "
+                f"Users Cleaned: {self.users_cleaned} Remaining: {self.remaining}{_eta}")
+
+
+class CleanupPipeline():
+    """
+    Deletes the image messages of banned and departed users that are not cleaned for a single Guild.
+
+    A producer pages the pending `user_images` rows in id order into one bounded queue per channel,
+    a worker per channel deletes them one at a time (Discord rate limits message deletes per channel)
+    with at most `concurrency` deletes in flight across all channels, and a committer removes the handled rows
+    and moves the Guild's `CleanupCheckpoint` forward in batches.
+
+    A full channel queue blocks the producer and a full result queue blocks the workers, so memory stays bounded.
+    A run stops after `time_budget` seconds, the next run resumes from the checkpoint.
+    """
+    _logger: logging.Logger = logging.getLogger()
+
+    def __init__(self, guild: discord.Guild, concurrency: int = 4, channel_queue_size: int = 50, page_size: int = 500,
+                 commit_size: int = 100, commit_interval: float = 5.0, time_budget: float = 600.0) -> None:
+        self._guild: discord.Guild = guild
+        self.page_size: int = page_size
+        self.commit_size: int = commit_size
+        self.commit_interval: float = commit_interval  # Seconds between commits when results trickle in.
+        self.time_budget: float = time_budget
+        self._channel_queue_size: int = channel_queue_size
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(value=concurrency)
+        self._channels: dict[int, asyncio.Queue[Image | None]] = {}  # Channel ID -> Images to delete
+        self._workers: list[asyncio.Task] = []
+        self._results: asyncio.Queue[tuple[Image, Outcome] | None] = asyncio.Queue(maxsize=commit_size * 2)
+        self._outstanding: deque[int] = deque()  # Image IDs handed out and not committed yet, in id order.
+        self._handled: set[int] = set()  # Outstanding image IDs that have a result.
+        self._last_produced: int = 0
+        self._remove: list[int] = []  # Image IDs to remove on the next commit.
+        self._deleted: int = 0  # Since the last commit, for the checkpoint totals.
+        self._failed: int = 0
+        self._deadline: float = 0
+        self._report: CleanupReport = CleanupReport(guild_id=guild.id)
+
+    async def run(self) -> CleanupReport:
+        _start: float = time.perf_counter()
+        self._deadline = time.monotonic() + self.time_budget
+        checkpoint: CleanupCheckpoint = await CleanupCheckpoint.get_or_start(guild_id=self._guild.id)
+        self._last_produced = checkpoint.last_image_id
+        committer: asyncio.Task = asyncio.create_task(self._commit_loop(checkpoint=checkpoint), name=f"cleanup_commit_{self._guild.id}")
+        feeder: asyncio.Task[bool] = asyncio.create_task(self._feed(checkpoint=checkpoint), name=f"cleanup_feed_{self._guild.id}")
+        completed: bool = False
+        try:
+            # Either stage failing ends the wait, otherwise the other one could block forever on a full queue.
+            await asyncio.wait((feeder, committer), return_when=asyncio.FIRST_EXCEPTION)
+            for stage in (committer, feeder):
+                if stage.done():
+                    stage.result()
+            exhausted: bool = feeder.result()
+            completed = True
+        finally:
+            if completed is False:
+                # Cancelled or a stage failed, stop every stage and keep what already has a result.
+                for worker in self._workers:
+                    worker.cancel()
+                feeder.cancel()
+                committer.cancel()
+                await asyncio.gather(*self._workers, feeder, committer, return_exceptions=True)
+                while not self._results.empty():
+                    result: tuple[Image, Outcome] | None = self._results.get_nowait()
+                    if result is not None:
+                        self._record(*result)
+                await asyncio.shield(self._flush(checkpoint=checkpoint))
+
+        self._report.finished = exhausted and len(self._outstanding) == 0
+        if self._report.finished:
+            self._report.users_cleaned = await checkpoint.finish()
+            self._report.remaining = self._report.failed
+        else:
+            self._report.remaining = await checkpoint.count_pending()
+        self._report.seconds = time.perf_counter() - _start
+        return self._report
+
+    def _queue(self, channel_id: int) -> asyncio.Queue[Image | None]:
+        queue: asyncio.Queue[Image | None] | None = self._channels.get(channel_id)
+        if queue is None:
+            queue = self._channels[channel_id] = asyncio.Queue(maxsize=self._channel_queue_size)
+            self._workers.append(asyncio.create_task(self._worker(channel_id=channel_id, queue=queue), name=f"cleanup_{channel_id}"))
+        return queue
+
+    async def _feed(self, checkpoint: CleanupCheckpoint) -> bool:
+        """
+        Produces the pending images, then shuts the workers and the committer down in order.
+
+        Returns:
+            bool: The `_produce` result.
+        """
+        exhausted: bool = await self._produce(checkpoint=checkpoint)
+        for queue in self._channels.values():
+            await queue.put(None)
+        await asyncio.gather(*self._workers)
+        await self._results.put(None)
+        return exhausted
+
+    async def _produce(self, checkpoint: CleanupCheckpoint) -> bool:
+        """
+        Returns:
+            bool: True if every pending image was handed out, False if the time budget ran out first.
+        """
+        after_id: int = checkpoint.last_image_id
+        while True:
+            page: list[Image] = await checkpoint.pending_images(after_id=after_id, limit=self.page_size)
+            if len(page) == 0:
+                return True
+            for image in page:
+                if time.monotonic() >= self._deadline:
+                    return False
+                self._outstanding.append(image.id)
+                self._last_produced = image.id
+                await self._queue(channel_id=image.channel_id).put(image)
+            after_id = page[-1].id
+
+    async def _worker(self, channel_id: int, queue: asyncio.Queue[Image | None]) -> None:
+        _channel = self._guild.get_channel_or_thread(channel_id)
+        while True:
+            image: Image | None = await queue.get()
+            if image is None:
+                return
+            if time.monotonic() >= self._deadline:
+                # Left outstanding, the checkpoint stays before it and the next run picks it up.
+                continue
+            if not isinstance(_channel, (discord.TextChannel, discord.Thread, discord.VoiceChannel)):
+                outcome: Outcome = "missing"
+            else:
+                async with self._semaphore:
+                    outcome = await self._delete(channel=_channel, image=image)
+            await self._results.put((image, outcome))
+
+    async def _delete(self, channel: discord.TextChannel | discord.Thread | discord.VoiceChannel, image: Image) -> Outcome:
+        try:
+            await channel.get_partial_message(image.message_id).delete()
+        except discord.NotFound:
+            return "missing"
+        except discord.Forbidden:
+            self._logger.error(msg=f"Unable to delete the message {image.message_id} in {channel} - Permission Forbidden | Guild ID: {self._guild.id}")
+            return "forbidden"
+        except Exception as e:
+            self._logger.error(msg=f"Unable to delete the message {image.message_id} in {channel} | Guild ID: {self._guild.id} | Error : {e}")
+            return "failed"
+        return "deleted"
+
+    def _record(self, image: Image, outcome: Outcome) -> None:
+        self._handled.add(image.id)
+        setattr(self._report, outcome, getattr(self._report, outcome) + 1)
+        if outcome == "failed":
+            self._failed += 1
+        else:
+            self._remove.append(image.id)
+            if outcome == "deleted":
+                self._deleted += 1
+
+    def _watermark(self) -> int:
+        """
+        The largest image ID where every image up to it has a result.
+        """
+        while len(self._outstanding) != 0 and self._outstanding[0] in self._handled:
+            self._handled.remove(self._outstanding.popleft())
+        return self._outstanding[0] - 1 if len(self._outstanding) != 0 else self._last_produced
+
+    async def _flush(self, checkpoint: CleanupCheckpoint) -> None:
+        _watermark: int = self._watermark()
+        if len(self._remove) == 0 and self._failed == 0 and _watermark <= checkpoint.last_image_id:
+            return
+        _remove, self._remove = self._remove, []
+        _deleted, self._deleted = self._deleted, 0
+        _failed, self._failed = self._failed, 0
+        try:
+            await checkpoint.commit(image_ids=_remove, last_image_id=_watermark, deleted=_deleted, failed=_failed)
+        except Exception as e:
+            # The rows stay and the checkpoint doesn't move, the next run finds those messages gone.
+            self._logger.error(msg=f"Failed to commit {len(_remove)} cleaned image rows. | Guild ID: {self._guild.id} | Error: {e}")
+
+    async def _commit_loop(self, checkpoint: CleanupCheckpoint) -> None:
+        while True:
+            # Not `wait_for`, on 3.11 it can swallow a cancel that lands as `get()` returns and this loop would never stop.
+            try:
+                async with asyncio.timeout(self.commit_interval):
+                    result: tuple[Image, Outcome] | None = await self._results.get()
+            except TimeoutError:
+                await self._flush(checkpoint=checkpoint)
+                continue
+            if result is None:
+                await self._flush(checkpoint=checkpoint)
+                return
+            self._record(*result)
+            if len(self._remove) + self._failed >= self.commit_size:
+                await self._flush(checkpoint=checkpoint)
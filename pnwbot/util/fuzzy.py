@@ -13,6 +13,7 @@ from __future__ import annotations
 import heapq
 import re
 from difflib import SequenceMatcher
+from functools import lru_cache
 from typing import (Callable, Generator, Iterable, Literal, Optional, Sequence,
                     TypeVar, overload)
 
@@ -75,6 +76,140 @@ def partial_token_sort_ratio(a: str, b: str) -> int:
     return partial_ratio(a, b)
 
 
+# Cached scorers.
+# These return the exact same scores as their counterparts above, but keep a `SequenceMatcher` per choice around
+# so the expensive half of the comparison (indexing the second sequence) only happens once per string.
+# Pass them as the `scorer=` of any `extract*` call when matching the same choices over and over (members, timezones).
+# The cached matchers are shared and mutated; only call these from the event loop thread.
+
+
+@lru_cache(maxsize=4096)
+def _cached_matcher(b: str) -> SequenceMatcher:
+    m = SequenceMatcher(None)
+    m.set_seq2(b)
+    return m
+
+
+def cached_ratio(a: str, b: str) -> int:
+    m = _cached_matcher(b)
+    m.set_seq1(a)
+    return int(round(100 * m.ratio()))
+
+
+def cached_quick_ratio(a: str, b: str) -> int:
+    m = _cached_matcher(b)
+    m.set_seq1(a)
+    return int(round(100 * m.quick_ratio()))
+
+
+def cached_partial_ratio(a: str, b: str) -> int:
+    short, long = (a, b) if len(a) <= len(b) else (b, a)
+    # `SequenceMatcher` only starts treating popular characters as junk at 200 characters,
+    # below that a substring is always found as a single full length block.
+    if len(long) < 200 and short in long:
+        return 100
+
+    m = _cached_matcher(long)
+    m.set_seq1(short)
+
+    blocks = m.get_matching_blocks()
+
+    scores: list[float] = []
+    for i, j, n in blocks:
+        start = max(j - i, 0)
+        end = start + len(short)
+        o = SequenceMatcher(None, short, long[start:end])
+        r = o.ratio()
+
+        if 100 * r > 99:
+            return 100
+        scores.append(r)
+
+    return int(round(100 * max(scores)))
+
+
+@lru_cache(maxsize=4096)
+def _cached_sort_tokens(a: str) -> str:
+    return _sort_tokens(a)
+
+
+def cached_token_sort_ratio(a: str, b: str) -> int:
+    return cached_ratio(_cached_sort_tokens(a), _cached_sort_tokens(b))
+
+
+def cached_quick_token_sort_ratio(a: str, b: str) -> int:
+    return cached_quick_ratio(_cached_sort_tokens(a), _cached_sort_tokens(b))
+
+
+def cached_partial_token_sort_ratio(a: str, b: str) -> int:
+    return cached_partial_ratio(_cached_sort_tokens(a), _cached_sort_tokens(b))
+
+
+def _length_ratio(a: str, b: str) -> int:
+    # Same as `SequenceMatcher.real_quick_ratio()`, without building a matcher.
+    total = len(a) + len(b)
+    if total == 0:
+        return 100
+    return int(round(100 * 2.0 * min(len(a), len(b)) / total))
+
+
+def _token_sort_length_ratio(a: str, b: str) -> int:
+    return _length_ratio(_cached_sort_tokens(a), _cached_sort_tokens(b))
+
+
+# Cheap upper bounds for the scorers that have them, cheapest first.
+# `real_quick_ratio() >= quick_ratio() >= ratio()` holds for any `SequenceMatcher`, and rounding keeps the order.
+_UPPER_BOUNDS: dict[Callable[[str, str], int], tuple[Callable[[str, str], int], ...]] = {
+    ratio: (_length_ratio, cached_quick_ratio),
+    cached_ratio: (_length_ratio, cached_quick_ratio),
+    quick_ratio: (_length_ratio,),
+    cached_quick_ratio: (_length_ratio,),
+    token_sort_ratio: (_token_sort_length_ratio, cached_quick_token_sort_ratio),
+    cached_token_sort_ratio: (_token_sort_length_ratio, cached_quick_token_sort_ratio),
+    quick_token_sort_ratio: (_token_sort_length_ratio,),
+    cached_quick_token_sort_ratio: (_token_sort_length_ratio,),
+}
+
+
+def _top_k_extraction(
+    query: str,
+    choices: Sequence[str] | dict[str, T],
+    scorer: Callable[[str, str], int],
+    score_cutoff: int,
+    limit: int,
+) -> list[tuple[str, int]] | list[tuple[str, int, T]]:
+    """
+    Same results as `heapq.nlargest(limit, _extraction_generator(...))`, while holding at most `limit` results.
+
+    Once `limit` results are held, a choice is only fully scored if every upper bound in `_UPPER_BOUNDS` says
+    it could still beat the current lowest result. Ties keep the earlier choice, just like `heapq.nlargest`.
+    """
+    if limit <= 0:
+        return []
+
+    bounds = _UPPER_BOUNDS.get(scorer, ())
+    # (score, -index, result) so the heap root is the lowest score, latest choice.
+    heap: list[tuple[int, int, tuple]] = []
+    items = choices.items() if isinstance(choices, dict) else ((choice, None) for choice in choices)
+    for index, (key, value) in enumerate(items):
+        floor = heap[0][0] + 1 if len(heap) >= limit else 0
+        floor = max(floor, score_cutoff)
+        if any(bound(query, key) < floor for bound in bounds):
+            continue
+
+        score = scorer(query, key)
+        if score < floor:
+            continue
+
+        entry = (score, -index, (key, score, value) if isinstance(choices, dict) else (key, score))
+        if len(heap) < limit:
+            heapq.heappush(heap, entry)
+        else:
+            heapq.heapreplace(heap, entry)
+
+    return [result for _, _, result in sorted(heap, reverse=True)]  # type: ignore
+
+
 @overload
 def _extraction_generator(
     query: str,
@@ -145,10 +280,10 @@ def extract(
     score_cutoff: int = 0,
     limit: Optional[int] = 10,
 ) -> list[tuple[str, int]] | list[tuple[str, int, T]]:
+    if limit is not None:
+        return _top_k_extraction(query, choices, scorer, score_cutoff, limit)
     it = _extraction_generator(query, choices, scorer, score_cutoff)
     def key(t): return t[1]
-    if limit is not None:
-        return heapq.nlargest(limit, it, key=key)  # type: ignore
     return sorted(it, key=key, reverse=True)  # type: ignore
 
 
@@ -181,12 +316,10 @@ def extract_one(
     scorer: Callable[[str, str], int] = quick_ratio,
     score_cutoff: int = 0,
 ) -> Optional[tuple[str, int]] | Optional[tuple[str, int, T]]:
-    it = _extraction_generator(query, choices, scorer, score_cutoff)
-    def key(t): return t[1]
     try:
-        return max(it, key=key)
-    except:
-        # iterator could return nothing
+        return _top_k_extraction(query, choices, scorer, score_cutoff, 1)[0]
+    except IndexError:
+        # nothing scored above the cutoff
         return None
 
 
@@ -330,25 +463,37 @@ def finder(
     key: Optional[Callable[[T], str]] = None,
     raw: bool = False,
 ) -> list[tuple[int, int, T]] | list[T]:
-    suggestions: list[tuple[int, int, T]] = []
-    text = str(text)
-    pat = '.*?'.join(map(re.escape, text))
-    regex = re.compile(pat, flags=re.IGNORECASE)
+    suggestions: list[tuple[int, int, str, T]] = []
+    regex = _finder_pattern(str(text))
     for item in collection:
         to_search = key(item) if key else str(item)
         r = regex.search(to_search)
         if r:
-            suggestions.append((len(r.group()), r.start(), item))
+            suggestions.append((len(r.group()), r.start(), to_search, item))
+    return _sort_suggestions(suggestions, key=key, raw=raw)
+
+
+@lru_cache(maxsize=256)
+def _finder_pattern(text: str) -> re.Pattern[str]:
+    pat = '.*?'.join(map(re.escape, text))
+    return re.compile(pat, flags=re.IGNORECASE)
+
 
-    def sort_key(tup: tuple[int, int, T]) -> tuple[int, int, str | T]:
+def _sort_suggestions(
+    suggestions: list[tuple[int, int, str, T]],
+    *,
+    key: Optional[Callable[[T], str]],
+    raw: bool,
+) -> list[tuple[int, int, T]] | list[T]:
+    def sort_key(tup: tuple[int, int, str, T]) -> tuple[int, int, str | T]:
         if key:
-            return tup[0], tup[1], key(tup[2])
-        return tup
+            return tup[0], tup[1], tup[2]
+        return tup[0], tup[1], tup[3]
 
     if raw:
-        return sorted(suggestions, key=sort_key)
+        return [(length, start, z) for length, start, _, z in sorted(suggestions, key=sort_key)]
     else:
-        return [z for _, _, z in sorted(suggestions, key=sort_key)]
+        return [z for _, _, _, z in sorted(suggestions, key=sort_key)]
 
 
 def find(text: str, collection: Iterable[str], *, key: Optional[Callable[[str], str]] = None) -> Optional[str]:
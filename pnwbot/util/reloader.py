@@ -0,0 +1,147 @@
+import ast
+import hashlib
+import logging
+import sys
+from dataclasses import dataclass, field
+from graphlib import CycleError, TopologicalSorter
+from pathlib import Path
+
+__all__: tuple[str, ...] = ("ModuleReloader", "ReloadReport")
+
+
+@dataclass
+class ReloadReport():
+    changed: list[str] = field(default_factory=list)  # Modules whose source changed.
+    reloaded: dict[str, float] = field(default_factory=dict)  # Module -> seconds, in reload order.
+    failed: dict[str, Exception] = field(default_factory=dict)
+    seconds: float = 0
+
+    def __str__(self) -> str:
+        if len(self.changed) == 0:
+            return "No changes found, nothing was reloaded."
+        _reloaded: str = "\n".join(f"> {name}: {seconds * 1000:.1f}ms" for name, seconds in self.reloaded.items())
+        _failed: str = "\n".join(f"> **{name}** - `{error}`" for name, error in self.failed.items())
+        return (f"Changed: {', '.join(self.changed)}\n"
+                f"Reloaded {len(self.reloaded)} module(s) in {self.seconds * 1000:.1f}ms\n{_reloaded}"
+                + (f"\nFailed:\n{_failed}" if len(self.failed) != 0 else ""))
+
+
+class ModuleReloader():
+    """
+    Tracks the source files of the bot's own modules (anything under `root`) by mtime and content hash,
+    along with the import graph between them.
+
+    `plan()` returns only the modules that changed plus every module depending on them, in dependency order,
+    so nothing outside our own packages (discord, aiohttp, etc..) is ever reloaded.
+    """
+    _logger: logging.Logger = logging.getLogger()
+
+    def __init__(self, root: Path) -> None:
+        self._root: Path = root.resolve()
+        self._state: dict[str, tuple[int, str]] = {}  # Module -> (mtime_ns, sha1 of the source)
+        self._imports: dict[str, tuple[int, set[str]]] = {}  # Module -> (mtime_ns, imported module names)
+
+    def _tracked(self) -> dict[str, Path]:
+        """
+        Our own modules currently imported, skipping `__main__` and anything inside a venv.
+        """
+        tracked: dict[str, Path] = {}
+        for name, module in list(sys.modules.items()):
+            file: str | None = getattr(module, "__file__", None)
+            if name == "__main__" or file is None or not file.endswith(".py"):
+                continue
+            path: Path = Path(file).resolve()
+            if path.is_relative_to(self._root) and "venv" not in path.parts and ".venv" not in path.parts:
+                tracked[name] = path
+        return tracked
+
+    @staticmethod
+    def _fingerprint(path: Path) -> tuple[int, str]:
+        return path.stat().st_mtime_ns, hashlib.sha1(path.read_bytes()).hexdigest()
+
+    def snapshot(self) -> None:
+        """
+        Records the current state of every tracked module as unchanged.
+        """
+        self._state = {name: self._fingerprint(path=path) for name, path in self._tracked().items()}
+
+    def _changed(self, tracked: dict[str, Path]) -> list[str]:
+        changed: list[str] = []
+        for name, path in tracked.items():
+            try:
+                mtime: int = path.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+            previous: tuple[int, str] | None = self._state.get(name)
+            if previous is None:
+                # First time we see this module, treat what is loaded as the baseline.
+                self._state[name] = self._fingerprint(path=path)
+                continue
+            if previous[0] == mtime:
+                continue
+            # Only hash when the mtime moved, saving a file that didn't change isn't a change.
+            fingerprint: tuple[int, str] = self._fingerprint(path=path)
+            if fingerprint[1] != previous[1]:
+                changed.append(name)
+            self._state[name] = fingerprint
+        return changed
+
+    def _module_imports(self, name: str, path: Path, tracked: dict[str, Path]) -> set[str]:
+        """
+        The tracked modules `name` imports anywhere in its source, cached per mtime.
+        """
+        mtime: int = path.stat().st_mtime_ns
+        cached: tuple[int, set[str]] | None = self._imports.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        package: str = name if path.name == "__init__.py" else name.rpartition(".")[0]
+        found: set[str] = set()
+        for node in ast.walk(ast.parse(source=path.read_text(encoding="utf-8"))):
+            if isinstance(node, ast.Import):
+                found.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                base: str = node.module or ""
+                if node.level > 0:
+                    parent: str = package.rsplit(".", node.level - 1)[0] if node.level > 1 else package
+                    base = f"{parent}.{base}" if base else parent
+                found.add(base)
+                # `from package import module`
+                found.update(f"{base}.{alias.name}" for alias in node.names)
+
+        imports: set[str] = {module for module in found if module in tracked and module != name}
+        self._imports[name] = (mtime, imports)
+        return imports
+
+    def plan(self) -> tuple[list[str], list[str]]:
+        """
+        Finds the changed modules and everything that depends on them.
+
+        Returns:
+            tuple[list[str], list[str]]: The changed modules, and the modules to reload in dependency order.
+        """
+        tracked: dict[str, Path] = self._tracked()
+        changed: list[str] = self._changed(tracked=tracked)
+        if len(changed) == 0:
+            return changed, []
+
+        graph: dict[str, set[str]] = {name: self._module_imports(name=name, path=path, tracked=tracked) for name, path in tracked.items()}
+        dependents: dict[str, set[str]] = {name: set() for name in graph}
+        for name, imports in graph.items():
+            for module in imports:
+                dependents[module].add(name)
+
+        affected: set[str] = set(changed)
+        pending: list[str] = list(changed)
+        while pending:
+            for dependent in dependents.get(pending.pop(), ()):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+
+        try:
+            order: list[str] = list(TopologicalSorter({name: graph[name] & affected for name in affected}).static_order())
+        except CycleError:
+            self._logger.warning(msg=f"Import cycle found between {', '.join(sorted(affected))}, reloading in name order.")
+            order = sorted(affected)
+        return changed, order
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
+__all__: tuple[str, ...] = ("StartupTracer",)
+
+
+class StartupTracer():
+    """
+    Records how long each startup phase took and holds the non-critical work that can wait until after READY.
+
+    Phases are timed with `async with tracer.phase("name"):`, single points in time with `tracer.mark("name")`.
+    Deferred work is registered with `tracer.defer("name", coro_func)` and ran by `run_deferred()` once the bot is ready,
+    anything deferred after that is scheduled straight away.
+    """
+    _logger: logging.Logger = logging.getLogger()
+
+    def __init__(self) -> None:
+        self._start: float = time.perf_counter()
+        self.phases: dict[str, float] = {}  # Phase name -> seconds it took
+        self.marks: dict[str, float] = {}  # Mark name -> seconds since the tracer was created
+        self._deferred: list[tuple[str, Callable[[], Awaitable[None]]]] = []
+        self._ready: bool = False
+        self._tasks: set[asyncio.Task] = set()
+
+    @asynccontextmanager
+    async def phase(self, name: str) -> AsyncIterator[None]:
+        _start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0) + (time.perf_counter() - _start)
+
+    def mark(self, name: str) -> None:
+        """
+        Records the time since startup, only the first call per `name` counts.
+        """
+        self.marks.setdefault(name, time.perf_counter() - self._start)
+
+    def defer(self, name: str, func: Callable[[], Awaitable[None]]) -> None:
+        """
+        Runs `func` after READY, so it doesn't delay commands becoming available.
+        """
+        if self._ready is True:
+            self._schedule(name=name, func=func)
+        else:
+            self._deferred.append((name, func))
+
+    def _schedule(self, name: str, func: Callable[[], Awaitable[None]]) -> None:
+        task: asyncio.Task = asyncio.create_task(self._run(name=name, func=func), name=f"deferred:{name}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, name: str, func: Callable[[], Awaitable[None]]) -> None:
+        try:
+            async with self.phase(name=f"deferred:{name}"):
+                await func()
+        except Exception as e:
+            self._logger.error(msg=f"Deferred startup work `{name}` failed. | Error: {e}")
+
+    async def run_deferred(self) -> None:
+        """
+        Runs all the deferred work concurrently, then logs the startup report.
+        """
+        if self._ready is True:
+            return
+        self._ready = True
+        self.mark(name="ready")
+        _deferred, self._deferred = self._deferred, []
+        await asyncio.gather(*(self._run(name=name, func=func) for name, func in _deferred))
+        self.mark(name="deferred_done")
+        self._logger.info(msg=self.report())
+
+    def report(self) -> str:
+        _phases: str = "\n".join(f"> {name}: {seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+        _marks: str = "\n".join(f"> {name}: +{seconds:.2f}s" for name, seconds in self.marks.items())
+        return f"**Startup Report**\n__Phases__\n{_phases}\n__Marks__\n{_marks}"
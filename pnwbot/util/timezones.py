@@ -3,12 +3,13 @@
 from __future__ import annotations
 
 import datetime
+import heapq
 from typing import TYPE_CHECKING, NamedTuple, Optional, Self
 
 import aiohttp
 import discord
-import fuzzy
 import pytz
+import util.fuzzy as fuzzy
 from attr import dataclass
 from dateutil.zoneinfo import get_zonefile_instance
 from discord import app_commands
@@ -124,6 +125,117 @@ class CLDRDataEntry(NamedTuple):
     preferred: Optional[str]
 
 
+class TimezoneIndex:
+    """
+    A prebuilt search index over the CLDR descriptions, IANA names and `_timezone_aliases`.
+
+    Short queries are resolved through a word prefix index, longer queries through a trigram index;
+    the candidates are then ranked with `util.fuzzy` so typos and partial city names still resolve.
+    """
+    _limit: int = 25
+    _candidate_limit: int = 6
+    _score_cutoff: int = 75
+
+    def __init__(self, choices: list[app_commands.Choice[str]], aliases: dict[str, str]) -> None:
+        self._ids: dict[str, int] = {}
+        self._names: list[str] = []
+        self._values: list[str] = []
+        self._keys: list[str] = []
+        self._prefixes: dict[str, list[int]] = {}
+        self._trigrams: dict[str, list[int]] = {}
+
+        for choice in choices:
+            self._add(name=choice.name, value=choice.value)
+        for name, value in aliases.items():
+            self._add(name=name, value=value)
+        # The IANA names themselves, eg. `America/Los_Angeles`.
+        for value in list(dict.fromkeys(aliases.values())):
+            self._add(name=value, value=value)
+
+        self._default: list[app_commands.Choice[str]] = [app_commands.Choice(name=name, value=value)
+                                                         for name, value in zip(self._names[:self._limit], self._values[:self._limit])]
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return text.lower().replace("/", " ").replace("_", " ")
+
+    def _add(self, name: str, value: str) -> None:
+        if name in self._ids:
+            return
+        _id: int = len(self._names)
+        key: str = self._normalize(text=name)
+        self._ids[name] = _id
+        self._names.append(name)
+        self._values.append(value)
+        self._keys.append(key)
+
+        for word in key.replace(",", " ").split():
+            for size in (1, 2):
+                if len(word) >= size:
+                    ids: list[int] = self._prefixes.setdefault(word[:size], [])
+                    if not ids or ids[-1] != _id:
+                        ids.append(_id)
+
+        for gram in set(self._grams(text=key)):
+            self._trigrams.setdefault(gram, []).append(_id)
+
+    @staticmethod
+    def _grams(text: str) -> list[str]:
+        padded: str = f" {text} "
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    def search(self, current: str) -> list[app_commands.Choice[str]]:
+        """
+        Finds the best matching timezones for an autocomplete query.
+
+        Args:
+            current (str): The partial text the user has typed so far.
+
+        Returns:
+            list[app_commands.Choice[str]]: At most 25 Choices, best match first.
+        """
+        query: str = self._normalize(text=current.strip())
+        if not query:
+            return list(self._default)
+
+        if len(query) < 3:
+            ids: list[int] = self._prefixes.get(query, [])
+            if not ids:
+                ids = [_id for _id, key in enumerate(self._keys) if query in key]
+            return [app_commands.Choice(name=self._names[_id], value=self._values[_id]) for _id in ids[:self._limit]]
+
+        # Entries containing the query outright are returned in index order (popular choices, aliases then IANA names).
+        # Only when there are none (eg. a typo) do we score anything sharing a third of the query trigrams with `fuzzy.cached_partial_ratio`.
+        grams: set[str] = set(self._grams(text=query))
+        hits: dict[int, int] = {}
+        for gram in grams:
+            for _id in self._trigrams.get(gram, ()):
+                hits[_id] = hits.get(_id, 0) + 1
+
+        exact: list[int] = []
+        threshold: int = max(1, len(grams) // 3)
+        fuzzy_ids: list[int] = []
+        for _id, count in hits.items():
+            if query in self._keys[_id]:
+                exact.append(_id)
+            elif count >= threshold:
+                fuzzy_ids.append(_id)
+        if exact:
+            exact.sort()
+            return [app_commands.Choice(name=self._names[_id], value=self._values[_id]) for _id in exact[:self._limit]]
+
+        ranked: list[tuple[int, int]] = []
+        for _id in heapq.nlargest(self._candidate_limit, fuzzy_ids, key=hits.__getitem__):
+            score: int = fuzzy.cached_partial_ratio(query, self._keys[_id])
+            if score >= self._score_cutoff:
+                ranked.append((-score, _id))
+        ranked.sort()
+        return [app_commands.Choice(name=self._names[_id], value=self._values[_id]) for _, _id in ranked[:self._limit]]
+
+
 async def convert_timezones(tz: str) -> datetime.datetime:
     conv_time: datetime.datetime = datetime.datetime.astimezone(discord.utils.utcnow(), tz=pytz.timezone(tz))
     return conv_time
@@ -1,81 +1,79 @@
-import importlib
-import inspect
+import asyncio
 import os
-import re
-import types
-from dataclasses import asdict, dataclass, field, fields
+import string
+import threading
+import time
+from dataclasses import dataclass, field, fields
 from pathlib import Path
 from typing import Mapping, TypedDict
 
-import aiofiles
 from database.settings import Settings
 from discord import Member
 
 
-def reload_module_dependencies(module_path: str, /) -> set[str]:
-    """Reloads all dependencies of a module with importlib
-
-    Parameters
-    ----------
-    module_path : str
-        The module to reload, dot qualified.
-
-    Returns
-    -------
-    set[str]
-        The reloaded modules
-
-    Raises
-    ------
-    ModuleNotFoundError
-        You passed an invalid module path.
-    """
-    out = []
-    mod_to_reload = importlib.import_module(module_path)
-
-    def get_pred(value):
-        return isinstance(value, types.ModuleType) or (inspect.isclass(value) or inspect.isfunction(value) and value.__module__ is not mod_to_reload)
-
-    items = inspect.getmembers(mod_to_reload, predicate=get_pred)
-
-    for _, value in items:
-        if isinstance(value, types.ModuleType):
-            importlib.reload(value)
-            out.append(value.__name__)
-        elif inspect.isclass(value) or (inspect.isfunction(value) and value.__module__ is not mod_to_reload):
-            module = importlib.import_module(value.__module__)
-            importlib.reload(module)
-            out.append(module.__name__)
-
-    return set(out)
-
-
-async def count_lines(path: str, filetype: str = ".py", skip_venv: bool = True) -> int:
+@dataclass()
+class CodeStats():
     lines: int = 0
-    for i in os.scandir(path):
-        if i.is_file():
-            if i.path.endswith(filetype):
-                if skip_venv and re.search(r"(\\|/)?venv(\\|/)", i.path):
-                    continue
-                lines += len((await (await aiofiles.open(i.path, "r")).read()).split("\n"))
-        elif i.is_dir():
-            lines += await count_lines(i.path, filetype)
-    return lines
-
-
-async def count_others(path: str, filetype: str = ".py", file_contains: str = "def", skip_venv: bool = True) -> int:
-    line_count: int = 0
-    for i in os.scandir(path):
-        if i.is_file():
-            if i.path.endswith(filetype):
-                if skip_venv and re.search(r"(\\|/)?venv(\\|/)", i.path):
-                    continue
-                line_count += len(
-                    [line for line in (await (await aiofiles.open(i.path, "r")).read()).split("\n") if file_contains in line]
-                )
-        elif i.is_dir():
-            line_count += await count_others(i.path, filetype, file_contains)
-    return line_count
+    functions: int = 0
+    classes: int = 0
+
+    def __add__(self, other: "CodeStats") -> "CodeStats":
+        return CodeStats(lines=self.lines + other.lines, functions=self.functions + other.functions, classes=self.classes + other.classes)
+
+
+# Directories `code_stats` never walks into, our own code doesn't live in any of these.
+_STATS_SKIP_DIRS: frozenset[str] = frozenset({"venv", ".venv", "env", "site-packages", "node_modules", "__pycache__", ".git"})
+_stats_cache: dict[str, tuple[int, CodeStats]] = {}  # File path -> (mtime_ns, stats of that file)
+# `code_stats` walks in worker threads, one walk at a time reads and prunes `_stats_cache`.
+_stats_lock: threading.Lock = threading.Lock()
+
+
+def _file_stats(path: str) -> CodeStats:
+    with open(file=path, mode="r", encoding="utf-8") as file:
+        text: str = file.read()
+    lines: list[str] = text.split("\n")
+    return CodeStats(lines=len(lines),
+                     functions=sum(1 for line in lines if "def " in line),
+                     classes=sum(1 for line in lines if "class " in line))
+
+
+def _walk_code_stats(path: str, filetype: str) -> CodeStats:
+    with _stats_lock:
+        return _walk_code_stats_locked(path=path, filetype=filetype)
+
+
+def _walk_code_stats_locked(path: str, filetype: str) -> CodeStats:
+    total: CodeStats = CodeStats()
+    seen: set[str] = set()
+    for root, dirs, files in os.walk(top=path):
+        # Prune in place so os.walk doesn't descend into them.
+        dirs[:] = [name for name in dirs if name not in _STATS_SKIP_DIRS and not name.startswith(".")]
+        for name in files:
+            if not name.endswith(filetype):
+                continue
+            file: str = os.path.join(root, name)
+            seen.add(file)
+            try:
+                mtime: int = os.stat(path=file).st_mtime_ns
+                cached: tuple[int, CodeStats] | None = _stats_cache.get(file)
+                if cached is None or cached[0] != mtime:
+                    cached = (mtime, _file_stats(path=file))
+                    _stats_cache[file] = cached
+            except (FileNotFoundError, UnicodeDecodeError):
+                continue
+            total += cached[1]
+
+    for file in [file for file in _stats_cache if file not in seen and file.startswith(path)]:
+        _stats_cache.pop(file)
+    return total
+
+
+async def code_stats(path: str, filetype: str = ".py") -> CodeStats:
+    """
+    Counts lines, functions and classes in one read per file, off the event loop.
+    Files are cached by mtime so only the ones that changed since the last call are read again.
+    """
+    return await asyncio.to_thread(_walk_code_stats, path, filetype)
 
 
 @dataclass()
@@ -97,7 +95,80 @@ class MarkDownPlaceHolders():
         self.intro_channel: str = f"<#{settings.personal_intros_channel_id}>"
 
     def to_dict(self) -> dict[str, str]:
-        return {key: str(object=value) for key, value in asdict(obj=self).items()}
+        # `asdict` deep copies every value, the fields are plain strings so read them directly.
+        return {key: str(object=getattr(self, key)) for key in _PLACEHOLDER_FIELDS}
+
+
+_PLACEHOLDER_FIELDS: tuple[str, ...] = tuple(entry.name for entry in fields(MarkDownPlaceHolders))
+
+
+@dataclass()
+class MarkDownTemplate():
+    """
+    A markdown file split once into literal text and `{placeholder}` names.
+    """
+    mtime: int
+    text: str
+    parts: tuple[tuple[str, str | None], ...]  # (Literal text, Placeholder name or None)
+    compiled: bool  # False when the file uses format syntax beyond `{name}`, those render through `str.format`.
+
+    @classmethod
+    def from_text(cls, text: str, mtime: int) -> "MarkDownTemplate":
+        parts: list[tuple[str, str | None]] = []
+        compiled: bool = True
+        for literal, name, spec, conversion in string.Formatter().parse(text):
+            if name is not None and (spec or conversion or not name.isidentifier()):
+                compiled = False
+            parts.append((literal, name))
+        return cls(mtime=mtime, text=text, parts=tuple(parts), compiled=compiled)
+
+    def render(self, values: Mapping[str, str]) -> str:
+        if self.compiled is False:
+            return self.text.format(**values)
+        # Same KeyError as `str.format` for a placeholder we don't have.
+        return "".join(literal if name is None else literal + values[name] for literal, name in self.parts)
+
+
+class MarkDownTemplates():
+    """
+    Loads each markdown file once and keeps it parsed in memory.
+
+    The file is only stat'ed again after `check_interval` seconds, and re-read if its mtime changed,
+    so a burst of joins renders without touching the disk.
+    """
+
+    def __init__(self, check_interval: float = 30) -> None:
+        self.check_interval: float = check_interval
+        self._paths: dict[str, Path] = {}  # Path as passed in -> resolved path
+        self._templates: dict[Path, tuple[float, MarkDownTemplate | None]] = {}  # Resolved path -> (Last checked, template)
+
+    def get(self, path: str) -> MarkDownTemplate | None:
+        """
+        Returns:
+            MarkDownTemplate | None: None if the file doesn't exist.
+        """
+        _file: Path | None = self._paths.get(path)
+        if _file is None:
+            _file = Path(__file__).parent.joinpath(path).resolve()
+            self._paths[path] = _file
+
+        _now: float = time.monotonic()
+        cached: tuple[float, MarkDownTemplate | None] | None = self._templates.get(_file)
+        if cached is not None and _now - cached[0] < self.check_interval:
+            return cached[1]
+
+        template: MarkDownTemplate | None = cached[1] if cached is not None else None
+        try:
+            mtime: int = _file.stat().st_mtime_ns
+            if template is None or template.mtime != mtime:
+                template = MarkDownTemplate.from_text(text=_file.read_text(encoding="utf-8"), mtime=mtime)
+        except (FileNotFoundError, IsADirectoryError):
+            template = None
+        self._templates[_file] = (_now, template)
+        return template
+
+
+_markdown_templates: MarkDownTemplates = MarkDownTemplates()
 
 
 def parse_markdown(path: str, placeholder_struct: MarkDownPlaceHolders , replace_placeholders: bool = True) -> str:
@@ -114,12 +185,12 @@ def parse_markdown(path: str, placeholder_struct: MarkDownPlaceHolders , replace
     Returns:
         str: f-string of the file contents with or without the placeholders replaced.
     """
-    _file: Path = Path(__file__).parent.joinpath(path).resolve()
+    _template: MarkDownTemplate | None = _markdown_templates.get(path=path)
 
     _contents = ""
-    if _file.is_file():
+    if _template is not None:
         if replace_placeholders is True:
-            _contents: str = _file.read_text(encoding="utf-8").format(**placeholder_struct.to_dict())
+            _contents: str = _template.render(values=placeholder_struct.to_dict())
         else:
-            _contents: str = _file.read_text(encoding="utf-8")
+            _contents: str = _template.text
     return f"{_contents}"